@@ -0,0 +1,168 @@
+from collections import Counter
+
+import pandas as pd
+
+from user_table import FIELDS
+
+EXPERIENCE_BINS = [0, 2, 5, 10, 20, 100]
+EXPERIENCE_LABELS = ["0-2 yrs", "3-5 yrs", "6-10 yrs", "11-20 yrs", "20+ yrs"]
+
+
+def _explode_skills(skills):
+    # Skills are either lists or comma separated strings; other values are ignored
+    skills = skills.dropna()
+    is_list = skills.map(lambda value: isinstance(value, list))
+    is_str = skills.map(lambda value: isinstance(value, str))
+    skills = skills[is_list | is_str]
+    if skills.empty:
+        return skills
+    is_str = is_str[skills.index]
+    split = skills.where(~is_str, skills[is_str].str.split(","))
+    exploded = split.explode().dropna()
+    from_str = is_str.reindex(exploded.index)
+    exploded[from_str] = exploded[from_str].str.strip()
+    return exploded
+
+
+def _median(value_counts):
+    total = sum(value_counts.values())
+    values = sorted(value_counts)
+    # Walk the sorted distinct values up to the middle one or two positions
+    middle = [(total - 1) // 2, total // 2]
+    found = []
+    seen = 0
+    for value in values:
+        seen += value_counts[value]
+        while len(found) < 2 and middle[len(found)] < seen:
+            found.append(value)
+    return (found[0] + found[1]) / 2
+
+
+# Everything the Key Metrics, Overview and Analytics views show, computed in
+# one vectorized pass per DataFrame and kept as counts and sums, so records
+# added later can be folded in without going over the old ones again.
+class Aggregates:
+    def __init__(self):
+        self.total_users = 0
+        self.columns = []                   # in order of first appearance
+        self.numeric_columns = set()
+        self.non_numeric_columns = set()
+        self.missing = Counter()            # column -> missing values
+        self.status_counts = Counter()
+        self.has_status = False
+        self.project_values = Counter()     # projects value -> users
+        self.experience_sum = 0.0
+        self.experience_count = 0
+        self.experience_bins = Counter()
+        self.skill_counts = Counter()
+
+    @classmethod
+    def from_frame(cls, df):
+        aggregates = cls()
+        aggregates.add_frame(df)
+        return aggregates
+
+    # The same aggregates for a UserTable, read off its columns without a
+    # DataFrame: only the id, name, friends and liked_pages fields exist, ids
+    # are numbers, the lists never are, and only a name can be missing
+    @classmethod
+    def from_table(cls, table):
+        aggregates = cls()
+        if not len(table):
+            return aggregates
+        aggregates.total_users = len(table)
+        aggregates.columns = list(FIELDS)
+        aggregates.numeric_columns = {"id"}
+        aggregates.non_numeric_columns = {"friends", "liked_pages"}
+
+        missing_names = {code for code, name in enumerate(table.names) if name is None or name != name}
+        if missing_names:
+            aggregates.missing["name"] = sum(1 for code in table.name_codes if code in missing_names)
+        names = [name for code, name in enumerate(table.names) if code not in missing_names]
+        if names and all(isinstance(name, (int, float)) and not isinstance(name, bool) for name in names):
+            aggregates.numeric_columns.add("name")
+        elif names:
+            aggregates.non_numeric_columns.add("name")
+        return aggregates
+
+    def add_records(self, records):
+        self.add_frame(pd.DataFrame(records))
+
+    def add_frame(self, df):
+        rows = len(df)
+        if not rows:
+            return
+
+        # Columns new in this frame were missing for every earlier row
+        for column in df.columns:
+            if column not in self.columns:
+                self.columns.append(column)
+                self.missing[column] += self.total_users
+        for column in self.columns:
+            if column not in df.columns:
+                self.missing[column] += rows
+        self.missing.update(df.isnull().sum().to_dict())
+
+        numeric = set(df.select_dtypes(include=["number"]).columns)
+        non_null = set(df.columns[df.notnull().any()])
+        self.numeric_columns |= numeric
+        self.non_numeric_columns |= non_null - numeric
+
+        if "status" in df.columns:
+            self.has_status = True
+            self.status_counts.update(df["status"].value_counts().to_dict())
+        if "projects" in df.columns:
+            self.project_values.update(df["projects"].dropna().value_counts().to_dict())
+        if "experience" in df.columns:
+            experience = df["experience"].dropna()
+            self.experience_sum += float(experience.sum())
+            self.experience_count += len(experience)
+            bins = pd.cut(experience, bins=EXPERIENCE_BINS, labels=EXPERIENCE_LABELS)
+            self.experience_bins.update(bins.value_counts().to_dict())
+        if "skills" in df.columns:
+            self.skill_counts.update(_explode_skills(df["skills"]).value_counts().to_dict())
+
+        self.total_users += rows
+
+    # --- Views ---
+    @property
+    def stats(self):
+        return {
+            "total_users": self.total_users,
+            "active_users": self.status_counts["active"] if self.has_status else self.total_users,
+            "total_projects": self.total_projects,
+            "avg_experience": round(self.experience_sum / self.experience_count, 1) if self.experience_count else 0
+        }
+
+    @property
+    def total_projects(self):
+        return int(sum(value * count for value, count in self.project_values.items()))
+
+    @property
+    def numeric_field_count(self):
+        return len(self.numeric_columns - self.non_numeric_columns)
+
+    def top_skills(self, n=8):
+        return dict(self.skill_counts.most_common(n))
+
+    def experience_distribution(self):
+        return {label: self.experience_bins[label] for label in EXPERIENCE_LABELS}
+
+    def project_stats(self):
+        if not self.project_values:
+            return {}
+        return {
+            "Min Projects": int(min(self.project_values)),
+            "Max Projects": int(max(self.project_values)),
+            "Median Projects": int(_median(self.project_values)),
+            "Total Projects": self.total_projects
+        }
+
+    # Percentage of non-missing values per column
+    def completeness(self):
+        if not self.total_users:
+            return {}
+        return {
+            column: round((self.total_users - self.missing[column]) / self.total_users * 100, 1)
+            for column in self.columns
+        }
@@ -1,8 +1,12 @@
 import streamlit as st
-import json
-import pandas as pd
+import os
 from datetime import datetime
 
+import instrumentation
+
+# pandas and the data modules are imported where they are first needed, so the
+# welcome screen paints without loading them
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title="Coders of Delhi Dashboard",
@@ -80,82 +84,79 @@ st.markdown("""
         height: 150px;
         box-shadow: 0 2px 4px rgba(0,0,0,0.1);
     }
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 24px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        padding: 10px 20px;
-        background-color: #f0f2f6;
-        border-radius: 5px;
-        font-weight: 500;
-    }
     </style>
 """, unsafe_allow_html=True)
 
-# --- Load Data Function ---
-@st.cache_data
-def load_data(filename):
-    try:
-        if isinstance(filename, str):
-            if filename.endswith(".json"):
-                with open(filename, "r") as f:
-                    data = json.load(f)
-            elif filename.endswith(".csv"):
-                data = pd.read_csv(filename).to_dict(orient="records")
-        else:
-            if filename.name.endswith(".json"):
-                data = json.load(filename)
-            elif filename.name.endswith(".csv"):
-                data = pd.read_csv(filename).to_dict(orient="records")
-        
-        # Handle different data structures
-        if isinstance(data, dict):
-            # If data is a dict with a list inside
-            for key in data.keys():
-                if isinstance(data[key], list):
-                    return data[key]
-            # If data is a single record
-            return [data]
-        elif isinstance(data, list):
-            return data
-        else:
-            return []
-    except Exception as e:
-        st.error(f"Error loading file: {str(e)}")
-        return []
+# --- Load Data ---
+# The uploaded file is parsed, cleaned and indexed once per file content.
+# The digest is kept per upload so reruns don't hash the file again.
+def upload_digest(uploaded_file):
+    key = f"digest_{uploaded_file.file_id}"
+    if key not in st.session_state:
+        from dashboard_data import file_digest
+        st.session_state[key] = file_digest(uploaded_file.getvalue())
+    return st.session_state[key]
 
-# --- Clean Data ---
-def clean_data(data):
-    if not data:
-        return []
-    
-    # If data doesn't have 'name' field, try to use first column as name
-    cleaned = []
-    for user in data:
-        if isinstance(user, dict):
-            # Check if 'name' exists, if not use first available field
-            if "name" not in user and len(user) > 0:
-                first_key = list(user.keys())[0]
-                user["name"] = user.get(first_key, "Unknown")
-            
-            # Only keep records with some data
-            if user.get("name", "").strip():
-                cleaned.append(user)
-    
-    return cleaned
+@st.cache_resource(show_spinner="Loading data...", max_entries=4)
+def load_dataset(digest, filename, _raw):
+    from dashboard_data import Dataset
+    return Dataset.from_upload(_raw, filename)
 
-# --- Analyze Data ---
-def analyze_data(data):
-    df = pd.DataFrame(data)
-    
-    stats = {
-        "total_users": len(df),
-        "active_users": len(df[df.get("status", "active") == "active"]) if "status" in df.columns else len(df),
-        "total_projects": int(df["projects"].sum()) if "projects" in df.columns else 0,
-        "avg_experience": round(df["experience"].mean(), 1) if "experience" in df.columns else 0
-    }
-    
-    return df, stats
+# --- Pagination ---
+# Renders page size / page controls and returns the (start, end) slice to show,
+# so only one page of rows or widgets is rendered per rerun
+def paginate(total, key, page_sizes=(10, 25, 50, 100)):
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Per page:", page_sizes, key=f"{key}_page_size")
+    pages = max(1, -(-total // page_size))
+    # A kept page number can be past the end once the rows shrink
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = 1
+    with col2:
+        page = st.number_input("Page:", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    with col3:
+        st.markdown(f"<br>Showing {start + 1 if total else 0}-{end} of {total}", unsafe_allow_html=True)
+    return start, end
+
+# --- Search ---
+# Positions of the records matching a search, kept in session state so paging
+# through the results and exporting them reuse the last lookup
+def search_results(dataset, digest, search_term, search_field, search_mode):
+    search_key = (digest, search_term, search_field, search_mode)
+    if st.session_state.get("search_key") != search_key or st.session_state.get("search_positions") is None:
+        st.session_state["search_positions"] = dataset.search_index.search(
+            search_term,
+            field=None if search_field == "All Fields" else search_field,
+            prefix=search_mode == "Starts with"
+        )
+        st.session_state["search_key"] = search_key
+    return st.session_state["search_positions"]
+
+# --- Export ---
+# Removes the prepared export file, if any
+def clear_export():
+    export = st.session_state.pop("export", None)
+    if export and os.path.exists(export["path"]):
+        os.remove(export["path"])
+
+# Most users offered by the User Details picker at once
+MAX_PICKER_OPTIONS = 100
+
+# --- Views ---
+# Streamlit forgets the state of widgets that weren't drawn in a run, so the
+# inputs of the views that aren't shown are saved again on every rerun
+VIEW_WIDGETS = (
+    "user_list_page_size", "user_list_page", "user_query", "selected_user",
+    "search", "search_field", "search_mode", "search_results_page_size", "search_results_page"
+)
+
+def keep_view_state():
+    for key in VIEW_WIDGETS:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
 
 # --- Create Simple Charts ---
 def create_bar_chart(data_dict, title):
@@ -210,9 +211,13 @@ with st.sidebar:
 
 # --- Main Content ---
 if uploaded_file is not None:
-    # Load and clean data
-    data = load_data(uploaded_file)
-    data = clean_data(data)
+    # Load, clean and index the data (cached per file content)
+    try:
+        dataset = load_dataset(upload_digest(uploaded_file), uploaded_file.name, uploaded_file.getvalue())
+        data = dataset.users
+    except Exception as e:
+        st.error(f"Error loading file: {str(e)}")
+        data = []
     
     if not data:
         st.error("❌ No valid data found in the uploaded file.")
@@ -225,6 +230,8 @@ if uploaded_file is not None:
             
             # Try to show raw data
             try:
+                import json
+                import pandas as pd
                 uploaded_file.seek(0)
                 if uploaded_file.name.endswith('.json'):
                     raw_data = json.load(uploaded_file)
@@ -259,7 +266,7 @@ if uploaded_file is not None:
             """)
         st.stop()
     
-    df, stats = analyze_data(data)
+    stats, aggregates = dataset.stats, dataset.aggregates
     
     # --- Key Metrics Row ---
     st.markdown("## 📈 Key Metrics")
@@ -302,24 +309,30 @@ if uploaded_file is not None:
     
     st.markdown("---")
     
-    # --- Tabs for Different Views ---
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "👤 User Details", "📈 Analytics", "🔍 Search"])
+    # --- Views ---
+    # Only the selected view runs, so a rerun does the work of one view
+    # instead of all four
+    keep_view_state()
+    view = st.radio(
+        "View:",
+        ["📊 Overview", "👤 User Details", "📈 Analytics", "🔍 Search"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="view"
+    )
     
-    with tab1:
+    if view == "📊 Overview":
         st.markdown("### 📋 Data Overview")
         
         col1, col2 = st.columns([3, 2])
         
         with col1:
             st.markdown("#### User List")
-            # Display user table
-            display_df = df[["name", "id"]].head(15) if "id" in df.columns else df[["name"]].head(15)
+            # Display one page of the user table
+            start, end = paginate(len(data), "user_list")
+            page_df = dataset.frame(range(start, end))
+            display_df = page_df[["name", "id"]] if "id" in page_df.columns else page_df[["name"]]
             st.dataframe(display_df, use_container_width=True, height=400)
-            
-            # Pagination info
-            total_users = len(df)
-            if total_users > 15:
-                st.info(f"Showing 15 of {total_users} users")
         
         with col2:
             st.markdown("#### Quick Statistics")
@@ -327,35 +340,46 @@ if uploaded_file is not None:
             # Column statistics
             st.markdown(f"""
                 <div class="stat-box">
-                    <strong>📊 Data Columns:</strong> {len(df.columns)}<br>
-                    <strong>📝 Total Records:</strong> {len(df)}<br>
-                    <strong>🔢 Numeric Fields:</strong> {len(df.select_dtypes(include=['number']).columns)}
+                    <strong>📊 Data Columns:</strong> {len(aggregates.columns)}<br>
+                    <strong>📝 Total Records:</strong> {aggregates.total_users}<br>
+                    <strong>🔢 Numeric Fields:</strong> {aggregates.numeric_field_count}<br>
+                    <strong>📄 Pages:</strong> {len(dataset.pages)}
                 </div>
             """, unsafe_allow_html=True)
             
             # Skills distribution
-            if "skills" in df.columns:
+            if "skills" in aggregates.columns:
                 st.markdown("#### 🎯 Top Skills")
-                all_skills = []
-                for skills in df["skills"].dropna():
-                    if isinstance(skills, list):
-                        all_skills.extend(skills)
-                    elif isinstance(skills, str):
-                        all_skills.extend([s.strip() for s in skills.split(",")])
-                
-                if all_skills:
-                    skill_counts = pd.Series(all_skills).value_counts().head(8)
-                    skill_dict = skill_counts.to_dict()
+                skill_dict = aggregates.top_skills(8)
+                if skill_dict:
                     create_bar_chart(skill_dict, "")
     
-    with tab2:
+    elif view == "👤 User Details":
         st.markdown("### 👤 User Information")
         
-        user_names = {user["name"]: user for user in data}
-        selected_user = st.selectbox("🔍 Select a user:", [""] + list(user_names.keys()))
+        # Type to narrow the list down; only the first matches are offered
+        name_query = st.text_input("🔍 Find a user:", placeholder="Type a name...", key="user_query")
+        if name_query:
+            positions = dataset.search_index.search(name_query, field="name")
+        else:
+            positions = range(len(data))
+        if len(positions) > MAX_PICKER_OPTIONS:
+            st.caption(f"Showing the first {MAX_PICKER_OPTIONS} of {len(positions)} users, type more to narrow down")
+        
+        # The kept selection is dropped once it is no longer offered
+        options = [None] + list(positions[:MAX_PICKER_OPTIONS])
+        if st.session_state.get("selected_user") not in options:
+            st.session_state["selected_user"] = None
+        selected = st.selectbox(
+            "👤 Select a user:",
+            options,
+            format_func=lambda i: "" if i is None else data[i]["name"],
+            key="selected_user"
+        )
         
-        if selected_user:
-            user_info = user_names[selected_user]
+        if selected is not None:
+            user_info = data[selected]
+            selected_user = user_info["name"]
             
             col1, col2 = st.columns([2, 1])
             
@@ -376,6 +400,17 @@ if uploaded_file is not None:
                             info_html += f"<p><strong>{key.title()}:</strong> {value}</p>"
                 info_html += "</div>"
                 st.markdown(info_html, unsafe_allow_html=True)
+                
+                # Suggestions from the friend and page indexes (built on first use)
+                user_id = user_info.get("id")
+                if dataset.friend_graph is not None and user_id in dataset.friend_graph:
+                    people = dataset.friend_graph.people_you_may_know(user_id, k=5)
+                    st.markdown("#### 🤝 People You May Know")
+                    st.markdown(", ".join(dataset.user_label(person) for person in people) or "No suggestions yet")
+                if dataset.page_index is not None and user_id in dataset.page_index:
+                    pages = dataset.page_index.pages_you_might_like(user_id, k=5)
+                    st.markdown("#### 📄 Pages You Might Like")
+                    st.markdown(", ".join(dataset.page_label(page) for page in pages) or "No suggestions yet")
             
             with col2:
                 st.markdown("#### ⚡ Quick Actions")
@@ -394,30 +429,22 @@ if uploaded_file is not None:
         else:
             st.info("👆 Please select a user to view details")
     
-    with tab3:
+    elif view == "📈 Analytics":
         st.markdown("### 📈 Data Analytics")
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Experience distribution
-            if "experience" in df.columns:
+            if "experience" in aggregates.columns:
                 st.markdown("#### 💼 Experience Distribution")
-                exp_bins = pd.cut(df["experience"], bins=[0, 2, 5, 10, 20, 100], 
-                                 labels=["0-2 yrs", "3-5 yrs", "6-10 yrs", "11-20 yrs", "20+ yrs"])
-                exp_counts = exp_bins.value_counts().sort_index()
-                create_bar_chart(exp_counts.to_dict(), "")
+                create_bar_chart(aggregates.experience_distribution(), "")
         
         with col2:
             # Project distribution
-            if "projects" in df.columns:
+            if "projects" in aggregates.columns:
                 st.markdown("#### 📦 Projects Distribution")
-                proj_stats = {
-                    "Min Projects": int(df["projects"].min()),
-                    "Max Projects": int(df["projects"].max()),
-                    "Median Projects": int(df["projects"].median()),
-                    "Total Projects": int(df["projects"].sum())
-                }
+                proj_stats = aggregates.project_stats()
                 
                 for label, value in proj_stats.items():
                     st.markdown(f"""
@@ -432,16 +459,14 @@ if uploaded_file is not None:
         col3, col4 = st.columns(2)
         
         with col3:
-            if "status" in df.columns:
+            if aggregates.has_status:
                 st.markdown("#### 📊 Status Distribution")
-                status_counts = df["status"].value_counts().to_dict()
-                create_bar_chart(status_counts, "")
+                create_bar_chart(dict(aggregates.status_counts), "")
         
         with col4:
             # Data quality metrics
             st.markdown("#### ✅ Data Quality")
-            missing_data = df.isnull().sum()
-            completeness = ((len(df) - missing_data) / len(df) * 100).round(1)
+            completeness = aggregates.completeness()
             
             st.markdown("""
                 <div class="stat-box">
@@ -449,15 +474,15 @@ if uploaded_file is not None:
                 </div>
             """, unsafe_allow_html=True)
             
-            for col_name in df.columns[:5]:
+            for col_name in aggregates.columns[:5]:
                 comp_pct = completeness[col_name]
                 st.markdown(f"{col_name}: {comp_pct}%")
                 st.progress(comp_pct / 100)
     
-    with tab4:
+    elif view == "🔍 Search":
         st.markdown("### 🔍 Advanced Search")
         
-        col1, col2 = st.columns([3, 1])
+        col1, col2, col3 = st.columns([3, 1, 1])
         
         with col1:
             search_term = st.text_input(
@@ -469,25 +494,29 @@ if uploaded_file is not None:
         with col2:
             search_field = st.selectbox(
                 "Search in:",
-                ["All Fields"] + list(df.columns)
+                ["All Fields"] + aggregates.columns,
+                key="search_field"
+            )
+        
+        with col3:
+            search_mode = st.selectbox(
+                "Match:",
+                ["Contains", "Starts with"],
+                key="search_mode"
             )
         
         if search_term:
-            if search_field == "All Fields":
-                filtered_data = [
-                    user for user in data
-                    if any(search_term.lower() in str(value).lower() for value in user.values())
-                ]
-            else:
-                filtered_data = [
-                    user for user in data
-                    if search_term.lower() in str(user.get(search_field, "")).lower()
-                ]
+            # Look the term up in the search index (each field is indexed on its
+            # first search); paging through the results reuses the last lookup
+            positions = search_results(dataset, upload_digest(uploaded_file), search_term, search_field, search_mode)
             
-            st.markdown(f"#### 🎯 Found {len(filtered_data)} results")
+            st.markdown(f"#### 🎯 Found {len(positions)} results")
             
-            if filtered_data:
-                for i, user in enumerate(filtered_data, 1):
+            if positions:
+                # Only the current page of results gets widgets
+                start, end = paginate(len(positions), "search_results")
+                for i, position in enumerate(positions[start:end], start + 1):
+                    user = data[position]
                     with st.expander(f"👤 {i}. {user.get('name', 'Unknown')}"):
                         user_html = "<div class='user-card'>"
                         for key, value in user.items():
@@ -497,33 +526,60 @@ if uploaded_file is not None:
             else:
                 st.warning("⚠️ No results found for your search!")
         else:
+            st.session_state["search_positions"] = None
             st.info("👆 Enter a search term to filter users")
     
     # --- Download Section ---
     st.markdown("---")
     st.markdown("### 💾 Export Data")
     
+    # Exports are only written when asked for, a chunk of rows at a time, to a temp file
+    from exports import EXPORT_FORMATS, write_export
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        csv = df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download CSV",
-            data=csv,
-            file_name=f"coders_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+        export_format = st.selectbox("Format:", list(EXPORT_FORMATS), key="export_format")
+        export_scope = st.selectbox("Rows:", ["All Users", "Current Search Results"], key="export_scope")
+        search_positions = st.session_state.get("search_positions")
+        # Positions found in an earlier upload don't apply to this one: the
+        # same search is run again over the current rows
+        if search_positions is not None and st.session_state["search_key"][0] != upload_digest(uploaded_file):
+            search_positions = search_results(dataset, upload_digest(uploaded_file), *st.session_state["search_key"][1:])
+        export_key = (upload_digest(uploaded_file), export_format, export_scope,
+                      st.session_state.get("search_key") if export_scope == "Current Search Results" else None)
+        
+        if st.button("⚙️ Prepare Export", use_container_width=True):
+            if export_scope == "Current Search Results" and search_positions is None:
+                st.warning("⚠️ Search for something first to export its results")
+            else:
+                clear_export()
+                positions = search_positions if export_scope == "Current Search Results" else None
+                records = data if positions is None else dataset.rows(positions)
+                try:
+                    path = write_export(export_format, records, aggregates.columns)
+                    st.session_state["export"] = {"key": export_key, "path": path}
+                except Exception as e:
+                    st.error(f"Could not export as {export_format}: {str(e)}")
     
     with col2:
-        json_str = json.dumps(data, indent=2)
-        st.download_button(
-            label="📥 Download JSON",
-            data=json_str,
-            file_name=f"coders_data_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json",
-            use_container_width=True
-        )
+        export = st.session_state.get("export")
+        # Exports left for an hour are removed, see exports.remove_stale_exports
+        if export and not os.path.exists(export["path"]):
+            st.session_state.pop("export")
+            export = None
+        if export and export["key"] == export_key:
+            extension, mime = EXPORT_FORMATS[export_format]
+            with open(export["path"], "rb") as export_file:
+                st.download_button(
+                    label=f"📥 Download {export_format}",
+                    data=export_file,
+                    file_name=f"coders_data_{datetime.now().strftime('%Y%m%d')}.{extension}",
+                    mime=mime,
+                    on_click=clear_export,
+                    use_container_width=True
+                )
+        else:
+            st.info("👈 Pick a format and prepare the export to download it")
     
     with col3:
         # Summary report
@@ -603,6 +659,20 @@ else:
 }
         """, language="json")
 
+# --- Diagnostics (open the app with ?diagnostics=1) ---
+if st.query_params.get("diagnostics") == "1":
+    with st.expander("🛠️ Diagnostics"):
+        profiling = st.toggle("Profile stages (cProfile + tracemalloc)", value=instrumentation.profiling_enabled())
+        instrumentation.enable_profiling(profiling)
+        if st.button("Reset metrics"):
+            instrumentation.reset()
+        
+        metrics = instrumentation.snapshot()
+        st.json({key: value for key, value in metrics.items() if key != "profiles"})
+        for name, profile in metrics["profiles"].items():
+            st.markdown(f"**{name}** - peak traced memory: {profile['peak_traced_bytes']} bytes")
+            st.code(profile["stats"])
+
 # --- Footer ---
 st.markdown("---")
 st.markdown(
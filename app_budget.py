@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import streamlit as st
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+from streamlit.testing.v1 import AppTest
+
+from synthetic_data import write_data
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds each step of the dashboard may take on the default 100000 users.
+# The cold start covers loading, cleaning and aggregating the upload; the
+# first search and the first user shown build the search index and the friend
+# and page indexes; every other interaction is a plain rerun.
+WELCOME_BUDGET = 1.0
+COLD_START_BUDGET = 2.5
+FIRST_USE_BUDGET = 2.0
+RERUN_BUDGET = 0.25
+
+_upload = None
+
+
+# Stands in for the sidebar uploader, which AppTest can't drive
+def _file_uploader(*args, **kwargs):
+    if _upload is None:
+        return None
+    name, data = _upload
+    return UploadedFile(UploadedFileRec(file_id=name, name=name, type="application/json", data=data), None)
+
+
+def _timed(at, action=None):
+    start = time.perf_counter()
+    (action(at) if action else at).run()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return round(seconds, 3)
+
+
+# Drives app.py through a first visit, an upload and the usual interactions,
+# timing the script run behind each one. Returns (step, seconds, budget) rows
+# and whether the welcome screen got by without pandas.
+def measure_app(filename):
+    global _upload
+    st.file_uploader = _file_uploader
+    app = os.path.join(HERE, "app.py")
+    rows = []
+
+    _upload = None
+    at = AppTest.from_file(app, default_timeout=600)
+    rows.append(("welcome", _timed(at), WELCOME_BUDGET))
+    pandas_free = "pandas" not in sys.modules
+
+    with open(filename, "rb") as file:
+        _upload = (os.path.basename(filename), file.read())
+    st.cache_resource.clear()
+    at = AppTest.from_file(app, default_timeout=600)
+    rows.append(("cold_start", _timed(at), COLD_START_BUDGET))
+
+    steps = [
+        ("rerun", RERUN_BUDGET, None),
+        ("overview_page", RERUN_BUDGET, lambda at: at.number_input(key="user_list_page").set_value(2)),
+        ("analytics_view", RERUN_BUDGET, lambda at: at.radio(key="view").set_value("📈 Analytics")),
+        ("search_view", RERUN_BUDGET, lambda at: at.radio(key="view").set_value("🔍 Search")),
+        ("first_search", FIRST_USE_BUDGET, lambda at: at.text_input(key="search").input("amit")),
+        ("search", RERUN_BUDGET, lambda at: at.text_input(key="search").input("ami")),
+        ("search_page", RERUN_BUDGET, lambda at: at.number_input(key="search_results_page").set_value(2)),
+        ("user_view", RERUN_BUDGET, lambda at: at.radio(key="view").set_value("👤 User Details")),
+        ("user_query", RERUN_BUDGET, lambda at: at.text_input(key="user_query").input("priya")),
+        ("first_user", FIRST_USE_BUDGET, lambda at: at.selectbox(key="selected_user").set_value(1)),
+        ("user", RERUN_BUDGET, lambda at: at.selectbox(key="selected_user").set_value(21)),
+        ("overview_view", RERUN_BUDGET, lambda at: at.radio(key="view").set_value("📊 Overview")),
+    ]
+    for name, budget, action in steps:
+        rows.append((name, _timed(at, action), budget))
+    return rows, pandas_free
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the dashboard's cold start and reruns against their budgets")
+    parser.add_argument("--users", type=int, default=100000, help="users in the synthetic upload")
+    parser.add_argument("--data", help="JSON file to upload instead of synthetic data")
+    parser.add_argument("--output", help="JSON file to save the timings to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = args.data
+        if filename is None:
+            filename = os.path.join(tmp_dir, "data.json")
+            write_data(filename, args.users)
+        rows, pandas_free = measure_app(filename)
+
+    over = [name for name, seconds, budget in rows if seconds > budget]
+    for name, seconds, budget in rows:
+        print(f"{name:15} {seconds:7.3f}s  budget {budget:.2f}s{'  OVER' if seconds > budget else ''}")
+    print(f"welcome screen without pandas: {pandas_free}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({name: {"seconds": seconds, "budget": budget} for name, seconds, budget in rows}, file, indent=2)
+    sys.exit(1 if over or not pandas_free else 0)
@@ -0,0 +1,169 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from cleaning import clean_file
+from friend_graph import FriendGraph
+from page_index import PageIndex
+from stream_loader import iter_records
+from synthetic_data import write_data
+from user_table import UserTable
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# The notebooks hold the reference implementations; load just their imports
+# and function definitions so they can be timed as written
+def load_notebook_functions(filename):
+    with open(os.path.join(HERE, filename)) as file:
+        notebook = json.load(file)
+    namespace = {}
+    for cell in notebook["cells"]:
+        if cell["cell_type"] != "code":
+            continue
+        tree = ast.parse("".join(cell["source"]))
+        tree.body = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef))]
+        exec(compile(tree, filename, "exec"), namespace)
+    return namespace
+
+
+def _git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _load_json(filename):
+    with open(filename) as file:
+        return json.load(file)
+
+
+# Runs fn once for the wall time and once under tracemalloc for peak memory.
+# setup() runs untimed before each run and its result is passed to fn.
+def measure(fn, setup=None, memory=True):
+    arg = setup() if setup else None
+    start = time.perf_counter()
+    fn(arg)
+    result = {"seconds": round(time.perf_counter() - start, 6)}
+    if memory:
+        arg = setup() if setup else None
+        tracemalloc.start()
+        fn(arg)
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+# Each benchmark is (name, setup, fn), see measure. Query benchmarks time a
+# fixed sample of users.
+def benchmark_size(users, queries=20, seed=0, memory=True):
+    notebook_cleaning = load_notebook_functions("02_data_cleaning.ipynb")
+    notebook_friends = load_notebook_functions("03_people_you_may_know.ipynb")
+    notebook_pages = load_notebook_functions("04_pages_you_might_like.ipynb")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, "data.json")
+        write_data(filename, users, seed=seed)
+        with open(filename, "rb") as file:
+            raw = file.read()
+        data = _load_json(filename)
+        sample = random.Random(seed).sample([user["id"] for user in data["users"]], min(queries, users))
+        graph = FriendGraph.from_data(data)
+        page_index = PageIndex.from_data(data)
+
+        benchmarks = [
+            ("json_load", None, lambda _: _load_json(filename)),
+            ("stream_records", None, lambda _: sum(1 for _ in iter_records(filename))),
+            ("clean_data", lambda: _load_json(filename), notebook_cleaning["clean_data"]),
+            ("clean_file", None, lambda _: clean_file(filename)),
+            ("find_people_you_may_know", None, lambda _: [
+                notebook_friends["find_people_you_may_know"](user_id, data) for user_id in sample]),
+            ("find_pages_you_might_like", None, lambda _: [
+                notebook_pages["find_pages_you_might_like"](user_id, data) for user_id in sample]),
+            ("friend_graph_build", None, lambda _: FriendGraph.from_data(data)),
+            ("friend_graph_query", None, lambda _: [graph.people_you_may_know(user_id, 10) for user_id in sample]),
+            ("page_index_build", None, lambda _: PageIndex.from_data(data)),
+            ("page_index_query", None, lambda _: [page_index.pages_you_might_like(user_id, 10) for user_id in sample]),
+            ("user_table_build", None, lambda _: UserTable.from_data(data)),
+        ]
+
+        # The dashboard helpers need pandas. The upload is aggregated as the
+        # compact UserTable it becomes, and as plain records, the path any
+        # upload with other fields takes.
+        try:
+            from dashboard_data import Dataset, build_aggregates, load_data
+        except ImportError:
+            pass
+        else:
+            benchmarks += [
+                ("app_load_data", None, lambda _: load_data(raw, "data.json")),
+                ("app_dataset", None, lambda _: Dataset.from_upload(raw, "data.json")),
+                ("app_aggregates", lambda: Dataset.from_upload(raw, "data.json").users, build_aggregates),
+                ("app_aggregates_records", lambda: load_data(raw, "data.json")[0], build_aggregates),
+            ]
+
+        results = {}
+        for name, setup, fn in benchmarks:
+            result = measure(fn, setup, memory)
+            if name.endswith(("_you_may_know", "_you_might_like", "_query")):
+                result["queries"] = len(sample)
+            results[name] = result
+            print(f"  {name}: {result['seconds']:.4f}s", file=sys.stderr)
+        results["user_table_build"]["bytes_per_user"] = round(UserTable.from_data(data).nbytes() / users, 1)
+    return results
+
+
+def run_benchmarks(sizes, queries=20, seed=0, memory=True):
+    report = {
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "results": {},
+    }
+    for users in sizes:
+        print(f"{users} users", file=sys.stderr)
+        report["results"][str(users)] = benchmark_size(users, queries, seed, memory)
+    return report
+
+
+# Time ratio new / old for every benchmark present in both reports
+def compare(old, new):
+    ratios = {}
+    for size, benchmarks in new["results"].items():
+        for name, result in benchmarks.items():
+            before = old["results"].get(size, {}).get(name)
+            if before and before["seconds"]:
+                ratios[f"{size}/{name}"] = round(result["seconds"] / before["seconds"], 3)
+    return ratios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading, cleaning and recommendations on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="numbers of users")
+    parser.add_argument("--queries", type=int, default=20, help="users sampled for query benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.queries, args.seed, not args.no_memory)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.compare:
+        for name, ratio in compare(_load_json(args.compare), report).items():
+            print(f"{name}: {ratio}x")
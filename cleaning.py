@@ -0,0 +1,119 @@
+import gc
+from contextlib import contextmanager
+from itertools import repeat
+from operator import contains
+
+from instrumentation import count, timed
+from stream_loader import iter_records
+
+CLEANING_RULES = [
+    "blank_names",         # users removed because their name is blank
+    "duplicate_users",     # earlier records replaced by a later one with the same id
+    "duplicate_friends",   # repeated ids removed from friend lists
+    "dangling_friends",    # friend ids removed because that user doesn't exist (any more)
+    "asymmetric_friends",  # friendships added so that both users list each other
+    "inactive_users",      # users removed because they have no friends and no liked pages
+    "duplicate_pages",     # earlier page records replaced by a later one with the same id
+]
+
+
+# Cleans a stream of (section, record) pairs, as produced by iter_records.
+# The records are read once; the friend lists are then fixed up in memory.
+# Returns a new {"users": [...], "pages": [...]} dict and the number of
+# records or ids each rule touched. The input records are not modified.
+@timed("clean")
+def clean_records(records):
+    counts = dict.fromkeys(CLEANING_RULES, 0)
+    with paused_gc():
+        users, pages = dedupe_records(records, counts)
+        data = link_users(users, pages, counts)
+    for rule, n in counts.items():
+        count(f"clean.{rule}", n)
+    return data, counts
+
+
+# Cleaning allocates a few containers per user and frees none of them, which
+# makes the cyclic garbage collector walk the whole, growing heap again and
+# again; none of it is garbage, so collection is paused meanwhile.
+@contextmanager
+def paused_gc():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# The rules that only look at one record at a time: blank names, repeated
+# users and pages (the last record wins) and repeated friend ids.
+# Returns id -> record dicts for users and pages and adds to counts. Friend
+# lists are kept as dicts (ordered sets) until link_users is done with them.
+def dedupe_records(records, counts):
+    users = {}
+    pages = {}
+    for section, record in records:
+        if section == "users":
+            if not str(record.get("name", "")).strip():
+                counts["blank_names"] += 1
+                continue
+            if record["id"] in users:
+                counts["duplicate_users"] += 1
+            friends = dict.fromkeys(record["friends"])
+            counts["duplicate_friends"] += len(record["friends"]) - len(friends)
+            users[record["id"]] = {**record, "friends": friends, "liked_pages": list(record["liked_pages"])}
+        elif section == "pages":
+            if record["id"] in pages:
+                counts["duplicate_pages"] += 1
+            pages[record["id"]] = record
+    return users, pages
+
+
+# The rules that need every user: dangling and one-way friendships, then
+# inactive users. Updates the deduped users in place and adds to counts.
+# Both friendship rules are applied in one walk over the users, and each
+# user's friend ids are checked in bulk (set and map operations, not a Python
+# loop per id); only the users that need fixing are walked id by id.
+def link_users(users, pages, counts):
+    friend_sets = {user_id: user["friends"] for user_id, user in users.items()}
+    user_ids = friend_sets.keys()
+    for user_id, friends in friend_sets.items():
+        # Drop friend ids of users that don't exist
+        if not friends.keys() <= user_ids:
+            kept = {friend: None for friend in friends if friend in user_ids}
+            counts["dangling_friends"] += len(friends) - len(kept)
+            friends = friend_sets[user_id] = users[user_id]["friends"] = kept
+
+        # Make every friendship go both ways
+        if all(map(contains, map(friend_sets.__getitem__, friends), repeat(user_id))):
+            continue
+        for friend in friends:
+            other = friend_sets[friend]
+            if user_id not in other:
+                other[user_id] = None
+                counts["asymmetric_friends"] += 1
+
+    # After the walk above nobody lists a friendless user, so removing
+    # inactive users can't leave new dangling ids behind
+    active_users = []
+    for user in users.values():
+        if user["friends"] or user["liked_pages"]:
+            user["friends"] = list(user["friends"])
+            active_users.append(user)
+    counts["inactive_users"] += len(users) - len(active_users)
+    return {"users": active_users, "pages": list(pages.values())}
+
+
+# Same as clean_records for data that is already loaded
+def clean_dataset(data):
+    return clean_records(
+        (section, record)
+        for section in ("users", "pages")
+        for record in data.get(section, [])
+    )
+
+
+# Streams a file straight into the cleaning pass
+def clean_file(filename):
+    return clean_records(iter_records(filename))
@@ -0,0 +1,190 @@
+import hashlib
+import io
+import json
+from collections.abc import Sequence
+from functools import cached_property
+
+import pandas as pd
+
+from aggregates import Aggregates
+from friend_graph import FriendGraph
+from instrumentation import stage
+from page_index import PageIndex
+from search_index import SearchIndex
+from user_table import FIELDS, UserTable
+
+CHUNK_SIZE = 10000
+
+
+def file_digest(raw):
+    return hashlib.sha256(raw).hexdigest()
+
+
+# --- Load Data Function ---
+# Returns (users, pages). A {"users": [...], "pages": [...]} file keeps both
+# lists; any other dict uses its first list as the users, as before.
+def load_data(raw, filename):
+    if filename.endswith(".csv"):
+        return pd.read_csv(io.BytesIO(raw)).to_dict(orient="records"), []
+
+    data = json.loads(raw)
+
+    # Handle different data structures
+    if isinstance(data, dict):
+        if isinstance(data.get("users"), list):
+            pages = data.get("pages")
+            return data["users"], pages if isinstance(pages, list) else []
+        # If data is a dict with a list inside
+        for key in data.keys():
+            if isinstance(data[key], list):
+                return data[key], []
+        # If data is a single record
+        return [data], []
+    elif isinstance(data, list):
+        return data, []
+    else:
+        return [], []
+
+
+# --- Clean Data ---
+def clean_data(data):
+    if not data:
+        return []
+
+    # If data doesn't have 'name' field, try to use first column as name
+    cleaned = []
+    for user in data:
+        if isinstance(user, dict):
+            # Check if 'name' exists, if not use first available field
+            if "name" not in user and len(user) > 0:
+                first_key = list(user.keys())[0]
+                user["name"] = user.get(first_key, "Unknown")
+
+            # Only keep records with some data
+            if str(user.get("name", "")).strip():
+                cleaned.append(user)
+
+    return cleaned
+
+
+# --- Analyze Data ---
+# A UserTable's aggregates come straight off its columns; other records are
+# aggregated a chunk of rows at a time
+def build_aggregates(users):
+    if isinstance(users, UserTable):
+        return Aggregates.from_table(users)
+    aggregates = Aggregates()
+    for start in range(0, len(users), CHUNK_SIZE):
+        aggregates.add_records(users[start:start + CHUNK_SIZE])
+    return aggregates
+
+
+def _has_list_field(users, field):
+    return bool(users) and all("id" in user and isinstance(user.get(field), list) for user in users)
+
+
+def _build_index(index_class, users, field):
+    if not _has_list_field(users, field):
+        return None
+    try:
+        return index_class.from_users(users)
+    except TypeError:
+        return None
+
+
+# Records with nothing but the social fields (the massive_data.json layout)
+# are kept as a UserTable, which takes about a tenth of the memory of the
+# dicts; anything else stays a list of records
+def _compact(users):
+    if not (_has_list_field(users, "friends") and _has_list_field(users, "liked_pages")):
+        return users
+    if any(field not in FIELDS for user in users for field in user):
+        return users
+    try:
+        return UserTable.from_users(users)
+    except ValueError:
+        return users
+
+
+# Read-only view of the records at the given positions, so exporting search
+# results doesn't copy the records first
+class RowView(Sequence):
+    def __init__(self, records, positions):
+        self.records = records
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.records[position] for position in self.positions[i]]
+        return self.records[self.positions[i]]
+
+
+# Everything the dashboard needs from one uploaded file, built once per file
+# content: the cleaned records, the aggregates behind every stat and chart,
+# lookups by id, and the friend and page indexes when the records carry those
+# lists. DataFrames are only built for the rows that are shown or exported,
+# and the indexes only when a view first needs them.
+class Dataset:
+    def __init__(self, users, pages):
+        with stage("clean"):
+            users = clean_data(users)
+            self.pages = [page for page in pages if isinstance(page, dict) and "id" in page]
+        self.users = _compact(users)
+
+        with stage("analyze"):
+            self.aggregates = build_aggregates(self.users)
+
+        self.page_by_id = {page["id"]: page for page in self.pages}
+        if isinstance(self.users, UserTable):
+            self.user_position = self.users.index
+        else:
+            self.user_position = {user["id"]: i for i, user in enumerate(self.users) if "id" in user}
+
+    # The friend and page indexes are built the first time a user's
+    # suggestions are shown, then kept with the dataset; None when the records
+    # don't carry the lists, or the lists hold something other than ids (such
+    # as {"id": 2, "since": 2020} objects), so no suggestions are shown
+    @cached_property
+    def friend_graph(self):
+        if isinstance(self.users, UserTable):
+            return self.users.friend_graph()
+        return _build_index(FriendGraph, self.users, "friends")
+
+    @cached_property
+    def page_index(self):
+        if isinstance(self.users, UserTable):
+            return self.users.page_index()
+        return _build_index(PageIndex, self.users, "liked_pages")
+
+    @property
+    def stats(self):
+        return self.aggregates.stats
+
+    # Built on the first search, then kept with the dataset
+    @cached_property
+    def search_index(self):
+        return SearchIndex(self.users)
+
+    def rows(self, positions):
+        return RowView(self.users, positions)
+
+    # DataFrame of the rows at the given positions, indexed by position
+    def frame(self, positions):
+        return pd.DataFrame([self.users[i] for i in positions], index=list(positions))
+
+    @classmethod
+    def from_upload(cls, raw, filename):
+        with stage("load"):
+            users, pages = load_data(raw, filename)
+        return cls(users, pages)
+
+    def user_label(self, user_id):
+        position = self.user_position.get(user_id)
+        return self.users[position]["name"] if position is not None else str(user_id)
+
+    def page_label(self, page_id):
+        page = self.page_by_id.get(page_id)
+        return page.get("name", str(page_id)) if page else str(page_id)
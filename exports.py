@@ -0,0 +1,179 @@
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+CHUNK_SIZE = 10000
+
+
+# --- Chunked writers ---
+# Each yields the export piece by piece, so a whole copy of the data is never
+# held as one string or one DataFrame
+
+# DataFrames of chunk_size records at a time, all with the same columns
+def iter_frames(records, columns, chunk_size=CHUNK_SIZE, dtype=None):
+    for start in range(0, len(records), chunk_size):
+        yield pd.DataFrame(list(records[start:start + chunk_size]), columns=columns, dtype=dtype)
+
+
+# Values are written as they are (object columns), so a number doesn't turn
+# into a float in just the chunks where its column has a gap
+def iter_csv(records, columns, chunk_size=CHUNK_SIZE):
+    if not len(records):
+        yield pd.DataFrame(columns=columns).to_csv(index=False).encode("utf-8")
+    for i, chunk in enumerate(iter_frames(records, columns, chunk_size, dtype=object)):
+        yield chunk.to_csv(index=False, header=i == 0).encode("utf-8")
+
+
+# Parquet needs one schema up front, while a column's values can change type
+# from one chunk to the next. So the records are first scanned for the
+# Python types in each column (and in its lists), which fix the column's
+# type: ints stay int64 unless a float turns up anywhere (then float64), and
+# a column mixing kinds of value (say skills given as lists by some users and
+# as "a, b" strings by others) is written as strings, with lists and objects
+# as JSON.
+def _column_types(records, columns, chunk_size=CHUNK_SIZE):
+    types = {column: set() for column in columns}
+    items = {column: set() for column in columns}
+    for start in range(0, len(records), chunk_size):
+        for record in records[start:start + chunk_size]:
+            for column, value in record.items():
+                kind = type(value)
+                if value is None or kind is float and value != value:    # NaN is missing too
+                    continue
+                types[column].add(kind)
+                if kind is list:
+                    items[column].update(map(type, value))
+    return types, items
+
+
+def _scalar_type(pa, types):
+    if not types:
+        return pa.null()
+    if types <= {bool}:
+        return pa.bool_()
+    if types <= {int}:
+        return pa.int64()
+    if types <= {int, float}:
+        return pa.float64()
+    if types <= {str}:
+        return pa.string()
+    return None
+
+
+def _arrow_type(pa, types, items):
+    if types == {list}:
+        item_type = _scalar_type(pa, items)
+        if item_type is not None:
+            return pa.list_(item_type)
+    return _scalar_type(pa, types) or pa.string()
+
+
+def _as_string(value):
+    if value is None or value != value:
+        return None
+    return json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+
+
+# Chunks are converted to Arrow tables, which are far smaller than the
+# DataFrames, and held until there are PARQUET_ROW_GROUP rows (small row
+# groups compress badly), then written as one row group.
+PARQUET_ROW_GROUP = 50000
+
+
+def write_parquet(path, records, columns, chunk_size=CHUNK_SIZE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types, items = _column_types(records, columns, chunk_size)
+    schema = pa.schema([(column, _arrow_type(pa, types[column], items[column])) for column in columns])
+    stringified = [column for column in columns if schema.field(column).type == pa.string()]
+    pending = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in iter_frames(records, columns, chunk_size, dtype=object):
+            for column in stringified:
+                chunk[column] = chunk[column].map(_as_string)
+            pending.append(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            if sum(map(len, pending)) >= PARQUET_ROW_GROUP:
+                writer.write_table(pa.concat_tables(pending))
+                pending = []
+        if pending:
+            writer.write_table(pa.concat_tables(pending))
+
+
+# Same text as json.dumps(records, indent=2)
+def iter_json(records):
+    if not records:
+        yield b"[]"
+        return
+    yield b"[\n"
+    for i, record in enumerate(records):
+        text = "  " + json.dumps(record, indent=2).replace("\n", "\n  ")
+        yield (text + (",\n" if i < len(records) - 1 else "\n")).encode("utf-8")
+    yield b"]"
+
+
+def iter_jsonl(records):
+    for record in records:
+        yield (json.dumps(record) + "\n").encode("utf-8")
+
+
+# format name -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSON": ("json", "application/json"),
+    "JSON Lines": ("jsonl", "application/jsonl"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+# Exports are written to their own temp directory. A prepared export that was
+# never downloaded (its session went away) is removed once it is this old.
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "coders_exports")
+EXPORT_MAX_AGE = 3600    # seconds
+
+
+def remove_stale_exports(max_age=EXPORT_MAX_AGE):
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass    # already removed by another session
+
+
+# Writes the records (a list of dicts or a UserTable) to a temporary file in
+# the chosen format and returns its path. The caller removes the file when
+# done. CSV and Parquet are built a chunk of records at a time with the given
+# columns, in order of first appearance in the records if not given.
+def write_export(export_format, records, columns=None):
+    remove_stale_exports()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    extension, _ = EXPORT_FORMATS[export_format]
+    fd, path = tempfile.mkstemp(suffix=f".{extension}", prefix="coders_export_", dir=EXPORT_DIR)
+    try:
+        if export_format in ("CSV", "Parquet") and columns is None:
+            columns = list(dict.fromkeys(field for record in records for field in record))
+        if export_format == "Parquet":
+            os.close(fd)
+            write_parquet(path, records, columns)
+            return path
+        if export_format == "CSV":
+            chunks = iter_csv(records, columns)
+        elif export_format == "JSON":
+            chunks = iter_json(records)
+        else:
+            chunks = iter_jsonl(records)
+        with os.fdopen(fd, "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+        return path
+    except Exception:
+        os.remove(path)
+        raise
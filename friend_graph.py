@@ -0,0 +1,237 @@
+import heapq
+import random
+import time
+from array import array
+from bisect import bisect_left
+
+from instrumentation import count, timed
+from ranking import top_k
+
+SHORTLIST = 100    # sampled candidates re-counted exactly, see sampled_mutual_friend_counts
+
+
+# Friend index built once from the users list.
+# Every user id gets a dense integer index and the friend lists are stored as
+# CSR arrays: the friends of index i are neighbors[offsets[i]:offsets[i + 1]],
+# in ascending order.
+class FriendGraph:
+    def __init__(self, ids, is_user, offsets, neighbors, index=None):
+        self.ids = ids                # index -> user id
+        if index is None:
+            index = {user_id: i for i, user_id in enumerate(ids)}
+        self.index = index            # user id -> index
+        self.is_user = is_user        # 1 if the id has its own user record
+        self.offsets = offsets
+        self.neighbors = neighbors
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_users(data["users"])
+
+    @classmethod
+    @timed("index.friend_graph")
+    def from_users(cls, users):
+        ids = []
+        index = {}
+        rows = {}
+
+        def index_of(user_id):
+            if user_id not in index:
+                index[user_id] = len(ids)
+                ids.append(user_id)
+            return index[user_id]
+
+        # One pass over the records, so a stream of users works as well as a list
+        for user in users:
+            i = index_of(user["id"])
+            rows[i] = sorted({index_of(friend) for friend in user["friends"]})
+
+        # Ids that only ever appear in someone's friend list get an empty row
+        is_user = bytearray(len(ids))
+        offsets = array("q", [0])
+        neighbors = array("i")
+        for i in range(len(ids)):
+            if i in rows:
+                is_user[i] = 1
+                neighbors.extend(rows[i])
+            offsets.append(len(neighbors))
+
+        return cls(ids, is_user, offsets, neighbors)
+
+    def __len__(self):
+        return sum(self.is_user)
+
+    def __contains__(self, user_id):
+        i = self.index.get(user_id)
+        return i is not None and bool(self.is_user[i])
+
+    def _row(self, i):
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+    def friends_of(self, user_id):
+        if user_id not in self:
+            return []
+        return [self.ids[j] for j in self._row(self.index[user_id])]
+
+    # Mutual-friend counts for every 2-hop candidate, keyed by index
+    def mutual_friend_counts(self, i):
+        row = self._row(i)
+        direct_friends = set(row)
+        suggestions = {}
+        edges = 0
+        for friend in row:
+            mutuals = self._row(friend)
+            edges += len(mutuals)
+            for mutual in mutuals:
+                if mutual != i and mutual not in direct_friends:
+                    suggestions[mutual] = suggestions.get(mutual, 0) + 1
+        count("recommend.friends.edges_traversed", edges)
+        count("recommend.friends.candidates", len(suggestions))
+        return suggestions
+
+    # Number of friends index m shares with the user whose friends are `row`
+    # (sorted) and `direct_friends` (the same as a set), and the ids looked at.
+    # m's row is walked against the set unless it is longer than bisecting it
+    # (it is sorted) for each of the user's friends, so the work is at most
+    # len(row) * log2 of m's friend count however big m's friend list is.
+    def _common_friends(self, direct_friends, row, m):
+        start, end = self.offsets[m], self.offsets[m + 1]
+        work = len(row) * (end - start).bit_length()
+        if end - start <= work:
+            return len(direct_friends.intersection(self.neighbors[start:end])), end - start
+        neighbors = self.neighbors
+        common = 0
+        for friend in row:
+            start = bisect_left(neighbors, friend, start, end)
+            if start < end and neighbors[start] == friend:
+                common += 1
+        return common, work
+
+    # Mutual-friend counts for users whose full expansion would walk more than
+    # max_edges edges (hubs). About max_edges of the 2-hop paths are sampled,
+    # each with the same probability, which finds the likely best candidates;
+    # the `shortlist` best of those then get their exact count from
+    # _common_friends, and only they are returned. Memory is bounded by the
+    # degree plus max_edges, time additionally by shortlist * degree * log2 of
+    # the biggest friend list. Paths are drawn with the user's index as seed,
+    # so a repeated query gives the same answer.
+    def sampled_mutual_friend_counts(self, i, max_edges, shortlist=SHORTLIST):
+        offsets, neighbors = self.offsets, self.neighbors
+        row = self._row(i)
+        total = sum(offsets[friend + 1] - offsets[friend] for friend in row)
+        if total <= max_edges:
+            return self.mutual_friend_counts(i)
+
+        rng = random.Random(i)
+        rate = max_edges / total
+        direct_friends = set(row)
+        sampled = {}
+        edges = 0
+        for friend in row:
+            start, end = offsets[friend], offsets[friend + 1]
+            expected = (end - start) * rate
+            n = min(int(expected) + (rng.random() < expected % 1), max_edges - edges)
+            for position in rng.choices(range(start, end), k=n):
+                mutual = neighbors[position]
+                if mutual != i and mutual not in direct_friends:
+                    sampled[mutual] = sampled.get(mutual, 0) + 1
+            edges += n
+
+        suggestions = {}
+        work = 0
+        for m in top_k(sampled, shortlist):
+            suggestions[m], ids_seen = self._common_friends(direct_friends, row, m)
+            work += ids_seen
+        count("recommend.friends.sampled", 1)
+        count("recommend.friends.recount_work", work)
+        count("recommend.friends.edges_traversed", edges)
+        count("recommend.friends.candidates", len(sampled))
+        return suggestions
+
+    # Same result as find_people_you_may_know, but only touches the
+    # 2-hop neighbourhood of the user instead of rebuilding the graph.
+    # With max_edges set, users with a bigger neighbourhood get the sampled
+    # counts above instead (at most max(k, SHORTLIST) suggestions).
+    @timed("recommend.friends")
+    def people_you_may_know(self, user_id, k=None, max_edges=None):
+        if user_id not in self:
+            return []
+        i = self.index[user_id]
+        if max_edges is None:
+            suggestions = self.mutual_friend_counts(i)
+        else:
+            suggestions = self.sampled_mutual_friend_counts(i, max_edges, max(k or 0, SHORTLIST))
+        return top_k({self.ids[i]: count for i, count in suggestions.items()}, k)
+
+    # Users with the most friends, e.g. to check the sampled mode on hubs
+    def hubs(self, n=20):
+        users = (i for i in range(len(self.ids)) if self.is_user[i])
+        ranked = heapq.nsmallest(n, users, key=lambda i: (self.offsets[i] - self.offsets[i + 1], self.ids[i]))
+        return [self.ids[i] for i in ranked]
+
+    # Suggestions for every user in one pass, as (user_id, top k ids) pairs.
+    # This is the sparse product A·A computed row by row: each row of friend
+    # counts is accumulated into a dense scratch array, with the user and their
+    # direct friends masked out, and the scratch is reset before the next row.
+    # The ranking is the same as people_you_may_know(user_id, k).
+    # start and stop limit the pass to a range of indices, so it can be split
+    # into shards.
+    def all_people_you_may_know(self, k=10, start=0, stop=None):
+        n = len(self.ids)
+        offsets, neighbors = self.offsets, self.neighbors
+        counts = array("i", [0]) * n
+        masked = bytearray(n)
+
+        for i in range(start, n if stop is None else stop):
+            if not self.is_user[i]:
+                continue
+            row = neighbors[offsets[i]:offsets[i + 1]]
+            masked[i] = 1
+            for friend in row:
+                masked[friend] = 1
+
+            candidates = []
+            for friend in row:
+                for mutual in neighbors[offsets[friend]:offsets[friend + 1]]:
+                    if not masked[mutual]:
+                        if counts[mutual] == 0:
+                            candidates.append(mutual)
+                        counts[mutual] += 1
+
+            if k is None:
+                ranked = sorted(candidates, key=lambda m: (-counts[m], self.ids[m]))
+            else:
+                ranked = heapq.nsmallest(k, candidates, key=lambda m: (-counts[m], self.ids[m]))
+            yield self.ids[i], [self.ids[m] for m in ranked]
+
+            for mutual in candidates:
+                counts[mutual] = 0
+            masked[i] = 0
+            for friend in row:
+                masked[friend] = 0
+
+
+# How close the sampled mode is to the exact one for the given users (the
+# 20 biggest hubs by default): recall@k of the sampled top k against the
+# exact top k, and the time per query of both.
+def approximate_recall(graph, max_edges, k=10, user_ids=None):
+    user_ids = graph.hubs() if user_ids is None else user_ids
+    recall = 0.0
+    queries = 0
+    timings = {"exact": [], "sampled": []}
+    for user_id in user_ids:
+        start = time.perf_counter()
+        exact = graph.people_you_may_know(user_id, k)
+        timings["exact"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        sampled = graph.people_you_may_know(user_id, k, max_edges)
+        timings["sampled"].append(time.perf_counter() - start)
+        if exact:
+            recall += len(set(exact) & set(sampled)) / len(exact)
+            queries += 1
+
+    result = {"max_edges": max_edges, "users": len(user_ids), "recall_at_k": round(recall / queries, 4) if queries else 1.0}
+    for mode, times in timings.items():
+        result[f"{mode}_ms_per_query"] = round(sum(times) / len(times) * 1000, 3) if times else 0.0
+        result[f"{mode}_max_ms"] = round(max(times) * 1000, 3) if times else 0.0
+    return result
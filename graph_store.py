@@ -0,0 +1,132 @@
+from page_index import PageIndex
+from ranking import top_k
+from rec_cache import RecommendationCache
+
+
+# Mutable graph behind the recommendations. Friend and like edits patch the
+# adjacency sets and the page -> likers index in place, and only the cached
+# suggestion lists of users whose results can change are dropped.
+class GraphStore:
+    def __init__(self, cache_size=10000, cache_ttl=None):
+        self.friends = {}                                # user id -> set of friend ids
+        self.pages = PageIndex({}, {})                   # user id -> set of pages, page -> set of likers
+        self.friend_suggestions = RecommendationCache(cache_size, cache_ttl)
+        self.page_suggestions = RecommendationCache(cache_size, cache_ttl)
+
+    @classmethod
+    def from_data(cls, data, **cache_options):
+        return cls.from_users(data["users"], **cache_options)
+
+    # Friend ids of unknown users are skipped and every friendship is stored
+    # both ways, as clean_records does
+    @classmethod
+    def from_users(cls, users, **cache_options):
+        store = cls(**cache_options)
+        users = list(users)
+        for user in users:
+            store.friends[user["id"]] = set()
+            store.pages.user_pages[user["id"]] = set()
+        for user in users:
+            for friend in user["friends"]:
+                if friend in store.friends and friend != user["id"]:
+                    store.friends[user["id"]].add(friend)
+                    store.friends[friend].add(user["id"])
+            for page in user["liked_pages"]:
+                store.pages.user_pages[user["id"]].add(page)
+                store.pages.page_likers.setdefault(page, set()).add(user["id"])
+        return store
+
+    def __len__(self):
+        return len(self.friends)
+
+    def __contains__(self, user_id):
+        return user_id in self.friends
+
+    def _check_user(self, user_id):
+        if user_id not in self.friends:
+            raise KeyError(f"Unknown user {user_id}")
+
+    # --- Invalidation ---
+    # Friend suggestions of u depend on u's friends and their friends, so a
+    # change to the friendship a-b affects a, b and everyone next to them
+    def _friends_changed(self, a, b):
+        for user_id in {a, b} | self.friends[a] | self.friends[b]:
+            self.friend_suggestions.invalidate(user_id)
+
+    # Page suggestions of u depend on the pages of everyone sharing a page with u,
+    # so a change to u's likes affects u and every liker of u's pages
+    def _likes_changed(self, user_id, page):
+        affected = {user_id} | self.pages.page_likers.get(page, set())
+        for liked in self.pages.user_pages[user_id]:
+            affected |= self.pages.page_likers[liked]
+        for other_user in affected:
+            self.page_suggestions.invalidate(other_user)
+
+    # --- Edits ---
+    def add_user(self, user_id, friends=(), liked_pages=()):
+        if user_id in self.friends:
+            raise ValueError(f"User {user_id} already exists")
+        self.friends[user_id] = set()
+        self.pages.user_pages[user_id] = set()
+        for friend in friends:
+            self.add_friend(user_id, friend)
+        for page in liked_pages:
+            self.like_page(user_id, page)
+
+    def add_friend(self, user_id, friend_id):
+        self._check_user(user_id)
+        self._check_user(friend_id)
+        if user_id == friend_id or friend_id in self.friends[user_id]:
+            return
+        self.friends[user_id].add(friend_id)
+        self.friends[friend_id].add(user_id)
+        self._friends_changed(user_id, friend_id)
+
+    def remove_friend(self, user_id, friend_id):
+        self._check_user(user_id)
+        self._check_user(friend_id)
+        if friend_id not in self.friends[user_id]:
+            return
+        # Invalidate while the edge is still there so both sides' neighbours are covered
+        self._friends_changed(user_id, friend_id)
+        self.friends[user_id].discard(friend_id)
+        self.friends[friend_id].discard(user_id)
+
+    def like_page(self, user_id, page_id):
+        self._check_user(user_id)
+        if page_id in self.pages.user_pages[user_id]:
+            return
+        self._likes_changed(user_id, page_id)
+        self.pages.user_pages[user_id].add(page_id)
+        self.pages.page_likers.setdefault(page_id, set()).add(user_id)
+
+    def unlike_page(self, user_id, page_id):
+        self._check_user(user_id)
+        if page_id not in self.pages.user_pages[user_id]:
+            return
+        self._likes_changed(user_id, page_id)
+        self.pages.user_pages[user_id].discard(page_id)
+        self.pages.page_likers[page_id].discard(user_id)
+
+    # --- Recommendations ---
+    def _people_you_may_know(self, user_id, k):
+        direct_friends = self.friends[user_id]
+        suggestions = {}
+        for friend in direct_friends:
+            for mutual in self.friends[friend]:
+                if mutual != user_id and mutual not in direct_friends:
+                    suggestions[mutual] = suggestions.get(mutual, 0) + 1
+        return top_k(suggestions, k)
+
+    def people_you_may_know(self, user_id, k=None):
+        if user_id not in self.friends:
+            return []
+        return self.friend_suggestions.get(user_id, k, lambda: self._people_you_may_know(user_id, k))
+
+    def pages_you_might_like(self, user_id, k=None):
+        if user_id not in self.friends:
+            return []
+        return self.page_suggestions.get(user_id, k, lambda: self.pages.pages_you_might_like(user_id, k))
+
+    def cache_stats(self):
+        return {"friends": self.friend_suggestions.stats(), "pages": self.page_suggestions.stats()}
@@ -0,0 +1,126 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stage timers and counters for load / clean / index / recommend. Recording a
+# stage costs two perf_counter calls and a few dict updates, so it stays on.
+# Profiling (cProfile + tracemalloc per stage) is opt-in, via
+# enable_profiling() or CODERS_PROFILE=1, as it slows everything down.
+_lock = threading.Lock()
+_timers = {}          # stage -> [calls, total seconds, max seconds]
+_counters = {}        # name -> count
+_profiles = {}        # stage -> {"stats": text, "peak_traced_bytes": int}
+_capture = threading.Lock()    # held by the one stage being profiled
+_profiling = os.environ.get("CODERS_PROFILE") == "1"
+
+
+def enable_profiling(enabled=True):
+    global _profiling
+    _profiling = enabled
+
+
+def profiling_enabled():
+    return _profiling
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(name, elapsed):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [1, elapsed, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+
+
+@contextmanager
+def stage(name):
+    # One stage at a time is profiled in the whole process, since profilers
+    # don't nest and tracemalloc is process-wide; stages that start meanwhile
+    # (nested ones, or other threads' such as other Streamlit sessions) are
+    # only timed. The peak still counts what other threads allocate meanwhile.
+    profile = _profiling and _capture.acquire(blocking=False)
+    if profile:
+        profiler = cProfile.Profile()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+        if profile:
+            profiler.disable()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            _capture.release()
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(15)
+            with _lock:
+                _profiles[name] = {"stats": text.getvalue(), "peak_traced_bytes": peak}
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Peak resident memory of the process so far, in bytes
+def peak_memory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def snapshot():
+    with _lock:
+        return {
+            "timers": {
+                name: {
+                    "calls": calls,
+                    "total_seconds": round(total, 6),
+                    "avg_seconds": round(total / calls, 6),
+                    "max_seconds": round(longest, 6),
+                }
+                for name, (calls, total, longest) in _timers.items()
+            },
+            "counters": dict(_counters),
+            "peak_memory_bytes": peak_memory(),
+            "profiles": {name: dict(profile) for name, profile in _profiles.items()},
+        }
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _profiles.clear()
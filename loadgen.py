@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+
+from stream_loader import iter_section
+
+
+# Request log in JSON Lines, one request per line:
+#   {"endpoint": "people_you_may_know", "user_id": 3, "k": 10}
+#   {"endpoint": "pages_you_might_like", "user_id": 7, "k": 10}
+#   {"endpoint": "batch", "user_ids": [3, 7, 12], "k": 10}
+# User ids are drawn with Zipf weights, so popular users repeat as they do in
+# real traffic (and concurrent repeats exercise the service's coalescing).
+def write_log(filename, user_ids, requests, batch_share=0.1, batch_size=20, k=10, seed=0):
+    rng = random.Random(seed)
+    user_ids = list(user_ids)
+    rng.shuffle(user_ids)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(user_ids) + 1)))
+    with open(filename, "w") as file:
+        for _ in range(requests):
+            if rng.random() < batch_share:
+                entry = {"endpoint": "batch", "user_ids": rng.choices(user_ids, cum_weights=cum_weights, k=batch_size)}
+            else:
+                endpoint = rng.choice(["people_you_may_know", "pages_you_might_like"])
+                entry = {"endpoint": endpoint, "user_id": rng.choices(user_ids, cum_weights=cum_weights)[0]}
+            entry["k"] = k
+            file.write(json.dumps(entry) + "\n")
+
+
+def read_log(filename):
+    with open(filename) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def _http_request(entry):
+    if entry["endpoint"] == "batch":
+        body = json.dumps({"user_ids": entry["user_ids"], "k": entry.get("k", 10)}).encode("utf-8")
+        return "POST", "/batch", body
+    return "GET", f"/{entry['endpoint']}?user_id={entry['user_id']}&k={entry.get('k', 10)}", b""
+
+
+# Sends one request on an open keep-alive connection and returns the status
+async def _send(reader, writer, host, method, target, body):
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+# Replays the log as fast as the service answers, over `connections`
+# keep-alive connections, and returns the latency percentiles and throughput
+async def replay(entries, host="127.0.0.1", port=8000, connections=16):
+    requests = [_http_request(entry) for entry in entries]
+    next_request = iter(range(len(requests)))
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in next_request:
+                start = time.perf_counter()
+                status = await _send(reader, writer, host, *requests[i])
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "qps": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a request log against rec_service.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="replay a log and report latency and QPS")
+    replay_parser.add_argument("log", help="JSON Lines request log")
+    replay_parser.add_argument("--host", default="127.0.0.1")
+    replay_parser.add_argument("--port", type=int, default=8000)
+    replay_parser.add_argument("--connections", type=int, default=16, help="concurrent keep-alive connections")
+
+    log_parser = commands.add_parser("make-log", help="write a synthetic request log")
+    log_parser.add_argument("log", help="JSON Lines file to write")
+    log_parser.add_argument("--data", default="massive_data.json", help="data file to take user ids from")
+    log_parser.add_argument("--requests", type=int, default=10000)
+    log_parser.add_argument("--batch-share", type=float, default=0.1, help="fraction of batch requests")
+    log_parser.add_argument("--batch-size", type=int, default=20)
+    log_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "make-log":
+        user_ids = [user["id"] for user in iter_section(args.data, "users")]
+        write_log(args.log, user_ids, args.requests, args.batch_share, args.batch_size, seed=args.seed)
+        print(f"Wrote {args.requests} requests to {args.log}")
+    else:
+        report = asyncio.run(replay(read_log(args.log), args.host, args.port, args.connections))
+        print(json.dumps(report, indent=2))
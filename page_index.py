@@ -0,0 +1,99 @@
+from collections.abc import Mapping
+
+from instrumentation import count, timed
+from ranking import top_k
+
+
+# Page index built once from the users list.
+# Keeps each user's liked pages and the inverted page -> likers lists, so a
+# query only visits users who share at least one page with the target.
+class PageIndex:
+    def __init__(self, user_pages, page_likers):
+        self.user_pages = user_pages      # user id -> tuple of liked page ids
+        self.page_likers = page_likers    # page id -> list of user ids
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_users(data["users"])
+
+    @classmethod
+    @timed("index.page_index")
+    def from_users(cls, users):
+        user_pages = {}
+        page_likers = {}
+        for user in users:
+            pages = tuple(dict.fromkeys(user["liked_pages"]))
+            user_pages[user["id"]] = pages
+            for page in pages:
+                page_likers.setdefault(page, []).append(user["id"])
+        return cls(user_pages, page_likers)
+
+    def __len__(self):
+        return len(self.user_pages)
+
+    def __contains__(self, user_id):
+        return user_id in self.user_pages
+
+    # Number of pages each other user shares with the target
+    def shared_page_counts(self, user_id):
+        shared = {}
+        for page in self.user_pages[user_id]:
+            for other_user in self.page_likers[page]:
+                if other_user != user_id:
+                    shared[other_user] = shared.get(other_user, 0) + 1
+        return shared
+
+    # Page scores as in find_pages_you_might_like: every page of another user
+    # gets that user's shared-page count added. Users with no shared page add 0,
+    # so they are never visited and pages that only they like are left out.
+    def page_scores(self, user_id):
+        liked_pages = set(self.user_pages[user_id])
+        page_suggestions = {}
+        overlapping_users = self.shared_page_counts(user_id)
+        for other_user, shared in overlapping_users.items():
+            for page in self.user_pages[other_user]:
+                if page not in liked_pages:
+                    page_suggestions[page] = page_suggestions.get(page, 0) + shared
+        count("recommend.pages.users_visited", len(overlapping_users))
+        count("recommend.pages.candidates", len(page_suggestions))
+        return page_suggestions
+
+    @timed("recommend.pages")
+    def pages_you_might_like(self, user_id, k=None):
+        if user_id not in self.user_pages:
+            return []
+        return top_k(self.page_scores(user_id), k)
+
+
+# Read-only id -> tuple of ids view over offsets + values arrays.
+# values hold positions into value_ids, or the ids themselves when
+# value_ids is None. Only keys whose flag in present is set count as members.
+class CSRMapping(Mapping):
+    def __init__(self, keys, index, offsets, values, value_ids=None, present=None):
+        self.keys_ = keys
+        self.index = index
+        self.offsets = offsets
+        self.values = values
+        self.value_ids = value_ids
+        self.present = present
+
+    def __getitem__(self, key):
+        i = self.index.get(key)
+        if i is None or (self.present is not None and not self.present[i]):
+            raise KeyError(key)
+        values = self.values[self.offsets[i]:self.offsets[i + 1]]
+        if self.value_ids is None:
+            return tuple(values)
+        return tuple(self.value_ids[j] for j in values)
+
+    def __contains__(self, key):
+        i = self.index.get(key)
+        return i is not None and (self.present is None or bool(self.present[i]))
+
+    def __iter__(self):
+        for i, key in enumerate(self.keys_):
+            if self.present is None or self.present[i]:
+                yield key
+
+    def __len__(self):
+        return len(self.keys_) if self.present is None else sum(self.present)
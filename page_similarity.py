@@ -0,0 +1,90 @@
+import heapq
+import math
+from collections import Counter
+
+from ranking import top_k
+
+METRICS = ["count", "cosine", "jaccard"]
+
+
+# Offline page x page co-like table for instant page recommendations.
+# For every page it keeps the top_n most similar pages (pairs liked together
+# by fewer than min_count users are pruned). Online, a user's suggestions are
+# a merge of the neighbour lists of the pages they like. Likes added later
+# only update the co-like counts and neighbour lists of the pages involved.
+class PageSimilarity:
+    def __init__(self, metric="cosine", top_n=50, min_count=1):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+        self.metric = metric
+        self.top_n = top_n
+        self.min_count = min_count
+        self.user_pages = {}        # user id -> set of liked pages
+        self.likes = Counter()      # page -> number of likers
+        self.co_likes = {}          # page -> Counter of pages liked by the same users
+        self.neighbours = {}        # page -> [(page, score)], best first
+
+    @classmethod
+    def from_data(cls, data, **options):
+        return cls.from_users(data["users"], **options)
+
+    @classmethod
+    def from_users(cls, users, **options):
+        table = cls(**options)
+        for user in users:
+            pages = set(user["liked_pages"])
+            table.user_pages[user["id"]] = pages
+            table.likes.update(pages)
+            for page in pages:
+                co_likes = table.co_likes.setdefault(page, Counter())
+                co_likes.update(pages)
+                del co_likes[page]
+        for page in table.likes:
+            table._rebuild(page)
+        return table
+
+    def similarity(self, a, b, count):
+        if self.metric == "count":
+            return count
+        if self.metric == "cosine":
+            return count / math.sqrt(self.likes[a] * self.likes[b])
+        return count / (self.likes[a] + self.likes[b] - count)
+
+    def _rebuild(self, page):
+        scored = (
+            (other, self.similarity(page, other, count))
+            for other, count in self.co_likes.get(page, {}).items()
+            if count >= self.min_count
+        )
+        self.neighbours[page] = heapq.nsmallest(self.top_n, scored, key=lambda x: (-x[1], x[0]))
+
+    # --- Incremental updates ---
+    def add_like(self, user_id, page_id):
+        pages = self.user_pages.setdefault(user_id, set())
+        if page_id in pages:
+            return
+        co_likes = self.co_likes.setdefault(page_id, Counter())
+        for other in pages:
+            co_likes[other] += 1
+            self.co_likes[other][page_id] += 1
+        pages.add(page_id)
+        self.likes[page_id] += 1
+        # The page's like count changed, so its own list and the lists of
+        # every page it is co-liked with need new scores
+        for page in {page_id} | set(co_likes):
+            self._rebuild(page)
+
+    # --- Recommendations ---
+    def page_scores(self, user_id):
+        liked_pages = self.user_pages.get(user_id, set())
+        scores = {}
+        for page in liked_pages:
+            for other, score in self.neighbours.get(page, ()):
+                if other not in liked_pages:
+                    scores[other] = scores.get(other, 0) + score
+        return scores
+
+    def pages_you_might_like(self, user_id, k=None):
+        if user_id not in self.user_pages:
+            return []
+        return top_k(self.page_scores(user_id), k)
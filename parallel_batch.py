@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from snapshot import load_snapshot
+
+# Set in each worker process by _init_worker
+_snapshot = None
+_graph = None
+_page_index = None
+
+
+# Every worker maps the same snapshot file, so the graph arrays live once in
+# the page cache and are shared by all processes instead of being pickled
+def _init_worker(snapshot_file):
+    global _snapshot, _graph, _page_index
+    _snapshot = load_snapshot(snapshot_file)
+    _graph = _snapshot.friend_graph()
+    _page_index = _snapshot.page_index()
+
+
+# Writes the suggestions of users with index in [start, stop) as JSON lines
+def _run_shard(start, stop, k, shard_file):
+    count = 0
+    with open(shard_file, "w") as file:
+        for user_id, people in _graph.all_people_you_may_know(k, start, stop):
+            record = {
+                "id": user_id,
+                "people_you_may_know": people,
+                "pages_you_might_like": _page_index.pages_you_might_like(user_id, k),
+            }
+            file.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+# Top k friend and page suggestions for every user in a snapshot, computed by
+# a pool of worker processes and merged into one JSON Lines file in snapshot order.
+# Returns the number of users written.
+def parallel_recommendations(snapshot_file, output_file, k=10, workers=None, shards_per_worker=4):
+    workers = workers or os.cpu_count() or 1
+    with load_snapshot(snapshot_file) as snapshot:
+        n = len(snapshot.user_ids)
+    shard_size = max(1, -(-n // (workers * shards_per_worker)))
+    bounds = [(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shard_files = [os.path.join(tmp_dir, f"shard_{i}.jsonl") for i in range(len(bounds))]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(snapshot_file,)) as pool:
+            futures = [
+                pool.submit(_run_shard, start, stop, k, shard_file)
+                for (start, stop), shard_file in zip(bounds, shard_files)
+            ]
+            total = sum(future.result() for future in futures)
+
+        with open(output_file, "wb") as output:
+            for shard_file in shard_files:
+                with open(shard_file, "rb") as shard:
+                    shutil.copyfileobj(shard, output)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every user in a snapshot")
+    parser.add_argument("snapshot", help="snapshot file written by save_snapshot")
+    parser.add_argument("output", help="JSON Lines file to write")
+    parser.add_argument("-k", type=int, default=10, help="suggestions per user")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    total = parallel_recommendations(args.snapshot, args.output, args.k, args.workers)
+    print(f"Wrote recommendations for {total} users to {args.output}")
@@ -0,0 +1,15 @@
+import heapq
+
+
+# Ids ordered by score (highest first), ties broken by the smaller id so the
+# order is the same on every run. With k set, only the best k are kept on a
+# bounded heap instead of sorting every candidate.
+def top_k(scores, k=None):
+    def rank_key(item):
+        return -item[1], item[0]
+
+    if k is None:
+        ranked = sorted(scores.items(), key=rank_key)
+    else:
+        ranked = heapq.nsmallest(k, scores.items(), key=rank_key)
+    return [item_id for item_id, _ in ranked]
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+
+# Recommendation results keyed by (user id, k), with a size limit (least
+# recently used entries are evicted first) and an optional time to live in
+# seconds. Entries can be dropped per user when that user's graph changes.
+class RecommendationCache:
+    def __init__(self, max_size=10000, ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()    # (user id, k) -> (result, expiry time)
+        self.keys_by_user = {}          # user id -> set of cached k values
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        del self.entries[key]
+        user_id, k = key
+        ks = self.keys_by_user[user_id]
+        ks.discard(k)
+        if not ks:
+            del self.keys_by_user[user_id]
+
+    def get(self, user_id, k, compute):
+        key = (user_id, k)
+        entry = self.entries.get(key)
+        if entry is not None:
+            result, expires = entry
+            if expires is None or self.clock() < expires:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return result
+            self.expirations += 1
+            self._remove(key)
+
+        self.misses += 1
+        result = compute()
+        if self.max_size > 0:
+            expires = None if self.ttl is None else self.clock() + self.ttl
+            self.entries[key] = (result, expires)
+            self.keys_by_user.setdefault(user_id, set()).add(k)
+            while len(self.entries) > self.max_size:
+                self.evictions += 1
+                self._remove(next(iter(self.entries)))
+        return result
+
+    def invalidate(self, user_id):
+        for k in self.keys_by_user.pop(user_id, ()):
+            del self.entries[(user_id, k)]
+            self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.keys_by_user.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
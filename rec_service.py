@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from cleaning import clean_file
+from snapshot import load_snapshot
+from user_table import UserTable
+
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_SIZE = 1000
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class BadRequest(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# Friend and page indexes loaded once, from a snapshot (mmapped, and left open
+# as the indexes read from it) or from a JSON file that is cleaned and stored
+# as a UserTable
+def load_indexes(filename):
+    if filename.endswith(".snap"):
+        snapshot = load_snapshot(filename)
+        return snapshot.friend_graph(), snapshot.page_index()
+    data, _ = clean_file(filename)
+    table = UserTable.from_data(data)
+    return table.friend_graph(), table.page_index()
+
+
+# Integer from the query string or a header
+def _int_param(value, name):
+    if not isinstance(value, str):
+        raise BadRequest(f"{name} must be an integer")
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+# Integer from a JSON body: true and 1.7 are not user ids
+def _int_value(value, name):
+    if type(value) is not int:
+        raise BadRequest(f"{name} must be an integer")
+    return value
+
+
+# HTTP/1.1 JSON service for the friend and page suggestions:
+#   GET  /people_you_may_know?user_id=1&k=10
+#   GET  /pages_you_might_like?user_id=1&k=10
+#   POST /batch  {"user_ids": [1, 2, ...], "k": 10}  -> both lists for each user
+#   GET  /stats
+# Connections are kept alive between requests. Suggestions are computed on a
+# small thread pool so the event loop keeps serving, and a (kind, user, k)
+# that is already being computed is awaited instead of computed again.
+class RecommendationService:
+    def __init__(self, graph, page_index, workers=4, max_edges=None):
+        self.graph = graph
+        self.page_index = page_index
+        self.max_edges = max_edges    # sampled friend suggestions for bigger neighbourhoods (hubs)
+        self.executor = ThreadPoolExecutor(workers)
+        self.in_flight = {}    # (kind, user id, k) -> future
+        self.stats = dict.fromkeys(("connections", "requests", "computed", "coalesced"), 0)
+
+    def _compute(self, kind, user_id, k):
+        if kind == "people_you_may_know":
+            return self.graph.people_you_may_know(user_id, k, self.max_edges)
+        return self.page_index.pages_you_might_like(user_id, k)
+
+    async def recommend(self, kind, user_id, k):
+        key = (kind, user_id, k)
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._compute, kind, user_id, k)
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.stats["computed"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded so a client that goes away doesn't cancel it for the others
+        return await asyncio.shield(future)
+
+    async def _batch(self, body):
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise BadRequest("Body must be JSON")
+        if not isinstance(request, dict) or not isinstance(request.get("user_ids"), list):
+            raise BadRequest('Body must look like {"user_ids": [...], "k": 10}')
+        user_ids = [_int_value(user_id, "user_ids") for user_id in request["user_ids"]]
+        if len(user_ids) > MAX_BATCH_SIZE:
+            raise BadRequest(f"At most {MAX_BATCH_SIZE} user ids per batch")
+        k = _int_value(request.get("k", 10), "k")
+
+        people = [self.recommend("people_you_may_know", user_id, k) for user_id in user_ids]
+        pages = [self.recommend("pages_you_might_like", user_id, k) for user_id in user_ids]
+        results = await asyncio.gather(*people, *pages)
+        return {"results": [
+            {"id": user_id, "people_you_may_know": results[i], "pages_you_might_like": results[len(user_ids) + i]}
+            for i, user_id in enumerate(user_ids)
+        ]}
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        if url.path in ("/people_you_may_know", "/pages_you_might_like"):
+            if method != "GET":
+                raise BadRequest("Use GET", 405)
+            query = parse_qs(url.query)
+            user_id = _int_param(query.get("user_id", [None])[0], "user_id")
+            k = _int_param(query.get("k", ["10"])[0], "k")
+            kind = url.path[1:]
+            return {"id": user_id, kind: await self.recommend(kind, user_id, k)}
+        if url.path == "/batch":
+            if method != "POST":
+                raise BadRequest("Use POST", 405)
+            return await self._batch(body)
+        if url.path == "/stats":
+            return {**self.stats, "in_flight": len(self.in_flight)}
+        raise BadRequest(f"No such endpoint: {url.path}", 404)
+
+    # Reads one request; returns None when the client has closed the connection
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise BadRequest("Malformed request line")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise BadRequest("Too many headers")
+
+        length = _int_param(headers.get("content-length", "0"), "Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("Body too large", 413)
+        body = await reader.readexactly(length) if length else b""
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, target, body, keep_alive
+
+    async def handle_connection(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, body, keep_alive = request
+                    self.stats["requests"] += 1
+                    status, payload = 200, await self.route(method, target, body)
+                except BadRequest as error:
+                    status, payload = error.status, {"error": str(error)}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as error:
+                    status, payload = 500, {"error": str(error)}
+
+                content = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            print(f"Serving recommendations on http://{host}:{port}")
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve friend and page suggestions over HTTP")
+    parser.add_argument("data", help="JSON data file or snapshot (.snap)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="threads computing suggestions")
+    parser.add_argument("--max-edges", type=int, default=None,
+                        help="sample friend suggestions of users whose 2-hop expansion is bigger than this")
+    args = parser.parse_args()
+
+    graph, page_index = load_indexes(args.data)
+    service = RecommendationService(graph, page_index, args.workers, args.max_edges)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
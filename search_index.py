@@ -0,0 +1,101 @@
+from instrumentation import count, stage, timed
+
+GRAM = 3
+MAX_INDEXED_LENGTH = 32    # fields with longer values on average are scanned, not indexed
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+# Search index over user records, built on the first search that needs it:
+# a search in one field indexes just that field, a search in all fields
+# indexes them all in one pass over the records.
+# Every field value is stored as the same lowercased string the Search tab
+# used to build on each keystroke, with a trigram -> record positions posting
+# list per field. A query only checks the records that contain all of its
+# trigrams; queries shorter than a trigram scan the prebuilt strings. Lists
+# (such as friend ids) and long values would add many trigrams per record for
+# little gain, so those fields are always scanned, which is still quick over
+# the prebuilt strings.
+class SearchIndex:
+    def __init__(self, records):
+        self.records = records
+        self.size = len(records)
+        self.texts = {}        # field -> list of lowercased values ("" if missing), None if no record has it
+        self.postings = {}     # field -> {trigram: [record positions]}, None if scanned
+        self._fields = None
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._build()
+        return self._fields
+
+    # Fills in the given fields, or every field (which also finds them) when
+    # fields is None
+    def _build(self, fields=None):
+        with stage("index.search"):
+            texts = {} if fields is None else dict.fromkeys(fields)
+            scanned = set()
+            for position, record in enumerate(self.records):
+                for field, value in record.items():
+                    if field not in texts:
+                        if fields is not None:
+                            continue
+                        texts[field] = None
+                    column = texts[field]
+                    if column is None:
+                        column = texts[field] = [""] * self.size
+                    if isinstance(value, (list, dict)):
+                        scanned.add(field)
+                    column[position] = str(value).lower()
+            if fields is None:
+                self._fields = list(texts)
+
+            for field, column in texts.items():
+                if field in self.texts:
+                    continue
+                self.texts[field] = column
+                if column is None or field in scanned or sum(map(len, column)) > MAX_INDEXED_LENGTH * self.size:
+                    self.postings[field] = None
+                    continue
+                postings = {}
+                for position, text in enumerate(column):
+                    for gram in _grams(text):
+                        postings.setdefault(gram, []).append(position)
+                self.postings[field] = postings
+
+    def _search_field(self, field, query, prefix):
+        texts = self.texts[field]
+        if texts is None:
+            return set()
+
+        postings = self.postings[field]
+        if len(query) < GRAM or postings is None:
+            candidates = range(self.size)
+        else:
+            lists = [postings.get(gram) for gram in _grams(query)]
+            if any(positions is None for positions in lists):
+                return set()
+            lists.sort(key=len)
+            candidates = set(lists[0]).intersection(*lists[1:])
+        count("search.candidates", len(candidates))
+
+        if prefix:
+            return {position for position in candidates if texts[position].startswith(query)}
+        return {position for position in candidates if query in texts[position]}
+
+    # Positions of matching records, in record order.
+    # field=None searches all fields; prefix=True matches from the start of a value.
+    @timed("search")
+    def search(self, query, field=None, prefix=False):
+        query = query.lower()
+        fields = self.fields if field is None else [field]
+        missing = [name for name in fields if name not in self.texts]
+        if missing:
+            self._build(missing)
+        matches = set()
+        for name in fields:
+            matches |= self._search_field(name, query, prefix)
+        return sorted(matches)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from cleaning import CLEANING_RULES, dedupe_records, link_users
+from instrumentation import count, stage
+
+
+def _read(filename):
+    with open(filename, "rb") as file:
+        return file.read()
+
+
+# Runs in a worker process: parses one shard and applies the per-record
+# cleaning rules, so only deduped records are sent back
+def _parse_shard(raw):
+    data = json.loads(raw)
+    counts = dict.fromkeys(CLEANING_RULES, 0)
+    users, pages = dedupe_records(
+        ((section, record) for section in ("users", "pages") for record in data.get(section, [])),
+        counts
+    )
+    return list(users.values()), list(pages.values()), counts
+
+
+# Reads, parses and cleans many shard files (each in the data.json layout)
+# into one dataset. Files are read on a thread pool and each one is handed to
+# a process pool for parsing as soon as it is in memory, so disks and cores
+# are kept busy together. The shards are then merged in the order given, with
+# the same rules as clean_records: a user or page id seen in several shards
+# keeps its last record. Returns the cleaned data and the per-rule counts.
+def ingest_shards(filenames, io_workers=None, parse_workers=None):
+    filenames = list(filenames)
+    io_workers = io_workers or min(32, len(filenames)) or 1
+    parse_workers = parse_workers or os.cpu_count() or 1
+
+    # With a single parser the records aren't worth pickling to another process
+    if parse_workers > 1:
+        parsers = ProcessPoolExecutor(parse_workers)
+    else:
+        parsers = ThreadPoolExecutor(1)
+
+    with stage("ingest"):
+        with ThreadPoolExecutor(io_workers) as readers, parsers:
+            reads = {readers.submit(_read, filename): i for i, filename in enumerate(filenames)}
+            parses = [None] * len(filenames)
+            for read in as_completed(reads):
+                parses[reads[read]] = parsers.submit(_parse_shard, read.result())
+            shards = [parse.result() for parse in parses]
+
+        with stage("ingest.merge"):
+            counts = dict.fromkeys(CLEANING_RULES, 0)
+            users = {}
+            pages = {}
+            for shard_users, shard_pages, shard_counts in shards:
+                for rule, n in shard_counts.items():
+                    counts[rule] += n
+                for user in shard_users:
+                    if user["id"] in users:
+                        counts["duplicate_users"] += 1
+                    users[user["id"]] = user
+                for page in shard_pages:
+                    if page["id"] in pages:
+                        counts["duplicate_pages"] += 1
+                    pages[page["id"]] = page
+            data = link_users(users, pages, counts)
+
+    count("ingest.shards", len(filenames))
+    for rule, n in counts.items():
+        count(f"clean.{rule}", n)
+    return data, counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge and clean many users/pages shard files")
+    parser.add_argument("shards", nargs="+", help="JSON files in the data.json layout")
+    parser.add_argument("--output", required=True, help="cleaned JSON file to write")
+    parser.add_argument("--io-workers", type=int, default=None, help="reader threads (default: one per shard, up to 32)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    data, counts = ingest_shards(args.shards, args.io_workers, args.parse_workers)
+    with open(args.output, "w") as file:
+        json.dump(data, file, indent=4)
+    print(f"Merged {len(args.shards)} shards into {len(data['users'])} users and {len(data['pages'])} pages")
+    for rule, n in counts.items():
+        print(f"{rule}: {n}")
@@ -0,0 +1,225 @@
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from functools import cached_property
+
+from friend_graph import FriendGraph
+from page_index import CSRMapping, PageIndex
+
+# File layout:
+#   header   magic, byte order, number of sections
+#   table    one (name, typecode, offset, count) entry per section
+#   sections raw array bytes, each starting on an 8-byte boundary
+MAGIC = b"CODSNAP2"
+_HEADER = struct.Struct("<8scxxxI")
+_ENTRY = struct.Struct("<24scxxxxxxxQQ")
+_BYTE_ORDER = b"L" if sys.byteorder == "little" else b"B"
+
+
+def _offsets_and_values(rows):
+    offsets = array("q", [0])
+    values = array("i")
+    for row in rows:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
+
+
+# Id -> position lookup sections, so loading a snapshot builds no index.
+# Ids that are small non-negative numbers (the usual 1..n) get an int32 table
+# indexed by id, as in user_table._IdIndex; other ids are stored sorted, with
+# their positions, and found with bisect.
+def _id_lookup(prefix, ids):
+    if ids and min(ids) >= 0 and max(ids) < 2 * len(ids) + 1024:
+        positions = array("i", [-1]) * (max(ids) + 1)
+        for position, id_ in enumerate(ids):
+            positions[id_] = position
+        return {f"{prefix}_positions": positions}
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    return {
+        f"{prefix}_sorted_ids": array("q", [ids[position] for position in order]),
+        f"{prefix}_sorted_positions": array("i", order),
+    }
+
+
+# Reads the sections written by _id_lookup, straight from the mapped file
+class _MappedIndex:
+    def __init__(self, positions=None, sorted_ids=None, sorted_positions=None):
+        self.positions = positions
+        self.sorted_ids = sorted_ids
+        self.sorted_positions = sorted_positions
+
+    def get(self, id_, default=None):
+        try:
+            if self.positions is not None:
+                position = self.positions[id_] if id_ >= 0 else -1
+                return position if position >= 0 else default
+            i = bisect_left(self.sorted_ids, id_)
+        except (IndexError, TypeError):
+            return default
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == id_:
+            return self.sorted_positions[i]
+        return default
+
+    def __getitem__(self, id_):
+        position = self.get(id_)
+        if position is None:
+            raise KeyError(id_)
+        return position
+
+    def __contains__(self, id_):
+        return self.get(id_) is not None
+
+
+def _string_table(strings):
+    offsets = array("q", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+# Writes a cleaned {"users": [...], "pages": [...]} dataset as a snapshot.
+# User and page ids must be integers.
+def save_snapshot(data, filename):
+    graph = FriendGraph.from_users(data["users"])
+    names = {user["id"]: user.get("name", "") for user in data["users"]}
+    likes = {user["id"]: dict.fromkeys(user["liked_pages"]) for user in data["users"]}
+
+    page_ids = [page["id"] for page in data["pages"]]
+    page_index = {page_id: i for i, page_id in enumerate(page_ids)}
+    page_names = [page.get("name", "") for page in data["pages"]]
+    for user_id in graph.ids:
+        for page in likes.get(user_id, ()):
+            if page not in page_index:
+                page_index[page] = len(page_ids)
+                page_ids.append(page)
+                page_names.append("")
+
+    user_pages = [[page_index[page] for page in likes.get(user_id, ())] for user_id in graph.ids]
+    page_users = [[] for _ in page_ids]
+    for i, pages in enumerate(user_pages):
+        for page in pages:
+            page_users[page].append(i)
+
+    user_page_offsets, user_page_values = _offsets_and_values(user_pages)
+    page_user_offsets, page_user_values = _offsets_and_values(page_users)
+    name_offsets, name_blob = _string_table(names.get(user_id, "") for user_id in graph.ids)
+    page_name_offsets, page_name_blob = _string_table(page_names)
+
+    sections = {
+        "user_ids": array("q", graph.ids),
+        "is_user": array("B", graph.is_user),
+        "friend_offsets": graph.offsets,
+        "friend_neighbors": graph.neighbors,
+        "user_page_offsets": user_page_offsets,
+        "user_page_values": user_page_values,
+        "page_ids": array("q", page_ids),
+        "page_user_offsets": page_user_offsets,
+        "page_user_values": page_user_values,
+        "name_offsets": name_offsets,
+        "name_blob": name_blob,
+        "page_name_offsets": page_name_offsets,
+        "page_name_blob": page_name_blob,
+        **_id_lookup("user", graph.ids),
+        **_id_lookup("page", page_ids),
+    }
+
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    entries = []
+    for name, values in sections.items():
+        offset += -offset % 8
+        entries.append((name, values, offset))
+        offset += len(values) * values.itemsize
+
+    with open(filename, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, _BYTE_ORDER, len(sections)))
+        for name, values, offset in entries:
+            file.write(_ENTRY.pack(name.encode(), values.typecode.encode(), offset, len(values)))
+        for name, values, offset in entries:
+            file.write(b"\0" * (offset - file.tell()))
+            values.tofile(file)
+
+
+# Snapshot opened with mmap. The arrays are memoryviews straight into the
+# mapped file, so nothing is parsed or copied on load, and every process that
+# opens the same file shares the same physical pages.
+class Snapshot:
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a snapshot file (or was saved by an older version; save it again)")
+        if byte_order != _BYTE_ORDER:
+            self.close()
+            raise ValueError(f"{filename} was written on a machine with a different byte order")
+
+        self._views = []
+        buffer = memoryview(self._mmap)
+        self._views.append(buffer)
+        for n in range(count):
+            name, typecode, offset, length = _ENTRY.unpack_from(self._mmap, _HEADER.size + _ENTRY.size * n)
+            itemsize = array(typecode.decode()).itemsize
+            view = buffer[offset:offset + length * itemsize].cast(typecode.decode())
+            self._views.append(view)
+            setattr(self, name.rstrip(b"\0").decode(), view)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Slices taken from the arrays (a friend row, say) stay readable after
+    # close and keep the mapping alive; it is then unmapped once they are gone
+    def close(self):
+        for view in getattr(self, "_views", []):
+            view.release()
+        self._views = []
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def _mapped_index(self, prefix):
+        return _MappedIndex(getattr(self, f"{prefix}_positions", None),
+                            getattr(self, f"{prefix}_sorted_ids", None),
+                            getattr(self, f"{prefix}_sorted_positions", None))
+
+    @cached_property
+    def user_index(self):
+        return self._mapped_index("user")
+
+    @cached_property
+    def page_position(self):
+        return self._mapped_index("page")
+
+    def friend_graph(self):
+        return FriendGraph(self.user_ids, self.is_user, self.friend_offsets, self.friend_neighbors,
+                           index=self.user_index)
+
+    def page_index(self):
+        user_pages = CSRMapping(self.user_ids, self.user_index, self.user_page_offsets,
+                                 self.user_page_values, self.page_ids, present=self.is_user)
+        page_likers = CSRMapping(self.page_ids, self.page_position, self.page_user_offsets,
+                                  self.page_user_values, self.user_ids)
+        return PageIndex(user_pages, page_likers)
+
+    def _string(self, offsets, blob, i):
+        return bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def user_name(self, user_id):
+        return self._string(self.name_offsets, self.name_blob, self.user_index[user_id])
+
+    def page_name(self, page_id):
+        return self._string(self.page_name_offsets, self.page_name_blob, self.page_position[page_id])
+
+
+def load_snapshot(filename):
+    return Snapshot(filename)
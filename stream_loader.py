@@ -0,0 +1,110 @@
+import json
+
+from instrumentation import count
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+# Incremental reader for files in the {"users": [...], "pages": [...]} layout.
+# The file is read in chunks and only one record is decoded at a time, so
+# memory stays at one chunk plus about twice the biggest record however big
+# the file is.
+class _Reader:
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=0):
+        chunk = self.file.read(max(self.chunk_size, size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the current chunk")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Each retry decodes the record from its start again, so read
+                # at least as much again as is buffered: a record spanning many
+                # chunks is then decoded a few times, not once per chunk
+                if not self._fill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # A number cut at the chunk boundary decodes fine, so make sure it ended
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+# Yields (section, record) for each item of each top-level list, e.g.
+# ("users", {...}) and ("pages", {...}), in file order
+def iter_records(source, chunk_size=1 << 16):
+    if isinstance(source, str):
+        with open(source, "r") as file:
+            yield from iter_records(file, chunk_size)
+        return
+
+    # Time spent in the generator includes whatever the consumer does between
+    # records, so only the number of records per section is recorded
+    records = {}
+    try:
+        yield from _parse(_Reader(source, chunk_size), records)
+    finally:
+        for key, n in records.items():
+            count(f"load.{key}", n)
+
+
+def _parse(reader, records):
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() != "]":
+                while True:
+                    yield key, reader.value()
+                    records[key] = records.get(key, 0) + 1
+                    if reader.peek() != ",":
+                        break
+                    reader.expect(",")
+            reader.expect("]")
+        else:
+            reader.value()
+        if reader.peek() != ",":
+            break
+        reader.expect(",")
+    reader.expect("}")
+
+
+# Records of a single section, e.g. iter_section("massive_data.json", "users")
+def iter_section(source, section, chunk_size=1 << 16):
+    for key, record in iter_records(source, chunk_size):
+        if key == section:
+            yield record
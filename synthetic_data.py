@@ -0,0 +1,83 @@
+import argparse
+import itertools
+import json
+import random
+from array import array
+
+NAMES = [
+    "Amit", "Priya", "Rahul", "Sara", "Neha", "Vikram", "Kunal", "Anjali", "Ravi", "Sneha",
+    "Arjun", "Pooja", "Rohan", "Kavya", "Nikhil", "Isha", "Manish", "Divya", "Sahil", "Tanya",
+]
+FIRST_PAGE_ID = 101
+
+
+# Seeded synthetic data in the same schema as massive_data.json.
+# Friendships follow preferential attachment (each new user befriends
+# `friends_per_user` existing users, picked in proportion to how many friends
+# they already have), which gives the power-law degrees of a real network.
+# Page likes follow a Zipf distribution, so a few pages are very popular.
+def generate_data(users, friends_per_user=5, pages=None, likes_per_user=3, seed=0):
+    rng = random.Random(seed)
+    pages = pages or max(10, users // 10)
+    friends = [array("i") for _ in range(users)]
+
+    # Every friendship adds both users here, so a uniform pick from this list
+    # picks users in proportion to their degree
+    endpoints = array("i")
+    seed_size = min(users, friends_per_user + 1)
+    for a, b in itertools.combinations(range(seed_size), 2):
+        friends[a].append(b)
+        friends[b].append(a)
+        endpoints.extend((a, b))
+    for user in range(seed_size, users):
+        chosen = set()
+        while len(chosen) < friends_per_user:
+            chosen.add(endpoints[rng.randrange(len(endpoints))] if endpoints else rng.randrange(user))
+        for friend in chosen:
+            friends[user].append(friend)
+            friends[friend].append(user)
+            endpoints.extend((user, friend))
+
+    page_ids = range(FIRST_PAGE_ID, FIRST_PAGE_ID + pages)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, pages + 1)))
+
+    def user_records():
+        for user in range(users):
+            liked = rng.choices(page_ids, cum_weights=cum_weights, k=1 + rng.randrange(2 * likes_per_user - 1))
+            yield {
+                "id": user + 1,
+                "name": NAMES[user % len(NAMES)],
+                "friends": [friend + 1 for friend in friends[user]],
+                "liked_pages": sorted(set(liked)),
+            }
+
+    page_records = ({"id": page_id, "name": f"Page {page_id}"} for page_id in page_ids)
+    return user_records(), page_records
+
+
+# Writes the generated data one record at a time, so files with millions of
+# users never have to exist as one JSON tree in memory
+def write_data(filename, users, **options):
+    user_records, page_records = generate_data(users, **options)
+    with open(filename, "w") as file:
+        file.write('{\n    "users": [')
+        for i, user in enumerate(user_records):
+            file.write(("," if i else "") + "\n        " + json.dumps(user))
+        file.write('\n    ],\n    "pages": [')
+        for i, page in enumerate(page_records):
+            file.write(("," if i else "") + "\n        " + json.dumps(page))
+        file.write("\n    ]\n}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic users/pages file")
+    parser.add_argument("output", help="JSON file to write")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--friends-per-user", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=None, help="default: users / 10")
+    parser.add_argument("--likes-per-user", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_data(args.output, args.users, friends_per_user=args.friends_per_user, pages=args.pages,
+               likes_per_user=args.likes_per_user, seed=args.seed)
+    print(f"Wrote {args.users} users to {args.output}")
@@ -0,0 +1,190 @@
+import sys
+from array import array
+from collections.abc import Sequence
+
+from friend_graph import FriendGraph
+from instrumentation import timed
+from page_index import CSRMapping, PageIndex
+
+FIELDS = ("id", "name", "friends", "liked_pages")
+
+
+# User id -> row. Ids that are small non-negative numbers (the usual 1..n)
+# are looked up in an int32 array indexed by id, anything else in a dict.
+class _IdIndex:
+    def __init__(self, ids):
+        self.rows = None
+        self.map = None
+        if ids and min(ids) >= 0 and max(ids) < 2 * len(ids) + 1024:
+            self.rows = array("i", [-1]) * (max(ids) + 1)
+            for row, user_id in enumerate(ids):
+                self.rows[user_id] = row
+            self.size = sum(1 for row in self.rows if row >= 0)
+        else:
+            self.map = {user_id: row for row, user_id in enumerate(ids)}
+            self.size = len(self.map)
+
+    def get(self, user_id, default=None):
+        if self.map is not None:
+            return self.map.get(user_id, default)
+        try:
+            row = self.rows[user_id] if user_id >= 0 else -1
+        except (IndexError, TypeError):
+            return default
+        return row if row >= 0 else default
+
+    def __getitem__(self, user_id):
+        row = self.get(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        return row
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __len__(self):
+        return self.size
+
+
+# Users stored column by column instead of one dict (plus two lists) each:
+#   ids                      int32 user id per row
+#   names / name_codes       distinct names, and an int32 code per row into them
+#   friend_offsets / friends friend ids of row r are friends[friend_offsets[r]:friend_offsets[r + 1]]
+#   like_offsets / likes     same for liked page ids
+# Only the id, name, friends and liked_pages fields are kept, and every id
+# has to fit in int32. Indexing a row gives back the same record as a dict,
+# so code written for data["users"] works on a table too.
+class UserTable(Sequence):
+    def __init__(self, ids, names, name_codes, friend_offsets, friends, like_offsets, likes):
+        self.ids = ids
+        self.names = names
+        self.name_codes = name_codes
+        self.friend_offsets = friend_offsets
+        self.friends = friends
+        self.like_offsets = like_offsets
+        self.likes = likes
+        self.index = _IdIndex(ids)    # user id -> row; a repeated id maps to its last row
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_users(data["users"])
+
+    # Liked pages are kept once per user, as PageIndex counts them
+    @classmethod
+    @timed("index.user_table")
+    def from_users(cls, users):
+        ids = array("i")
+        names = []
+        name_codes = array("i")
+        friend_offsets = array("q", [0])
+        friends = array("i")
+        like_offsets = array("q", [0])
+        likes = array("i")
+        name_code = {}
+
+        try:
+            for user in users:
+                ids.append(user["id"])
+                name = user.get("name", "")
+                if name not in name_code:
+                    name_code[name] = len(names)
+                    names.append(name)
+                name_codes.append(name_code[name])
+                friends.extend(user["friends"])
+                friend_offsets.append(len(friends))
+                likes.extend(dict.fromkeys(user["liked_pages"]))
+                like_offsets.append(len(likes))
+        except (TypeError, OverflowError) as error:
+            raise ValueError(f"UserTable needs int32 ids, friends and liked pages: {error}") from error
+
+        return cls(ids, names, name_codes, friend_offsets, friends, like_offsets, likes)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("UserTable row out of range")
+        return {
+            "id": self.ids[row],
+            "name": self.names[self.name_codes[row]],
+            "friends": self.friends[self.friend_offsets[row]:self.friend_offsets[row + 1]].tolist(),
+            "liked_pages": self._likes(row).tolist(),
+        }
+
+    def _likes(self, row):
+        return self.likes[self.like_offsets[row]:self.like_offsets[row + 1]]
+
+    # Rows that hold the current record of their id (only differs with repeated ids)
+    def _current(self):
+        if len(self.index) == len(self.ids):
+            return None
+        return bytearray(self.index[user_id] == row for row, user_id in enumerate(self.ids))
+
+    def name(self, user_id):
+        return self.names[self.name_codes[self.index[user_id]]]
+
+    # Friend index over the same rows; ids and the id lookup are shared with
+    # the table unless some friend id has no row of its own
+    def friend_graph(self):
+        n = len(self.ids)
+        current = self._current()
+        is_user = bytearray(b"\1") * n if current is None else current
+        offsets = array("q", [0])
+        neighbors = array("i")
+        dangling = {}
+        for row in range(n):
+            if is_user[row]:
+                indices = set()
+                for friend in self.friends[self.friend_offsets[row]:self.friend_offsets[row + 1]]:
+                    i = self.index.get(friend)
+                    if i is None:
+                        i = dangling.setdefault(friend, n + len(dangling))
+                    indices.add(i)
+                neighbors.extend(sorted(indices))
+            offsets.append(len(neighbors))
+
+        if not dangling:
+            return FriendGraph(self.ids, is_user, offsets, neighbors, index=self.index)
+        ids = array("i", self.ids)
+        ids.extend(dangling)
+        is_user.extend(bytes(len(dangling)))
+        offsets.extend([len(neighbors)] * len(dangling))
+        return FriendGraph(ids, is_user, offsets, neighbors)
+
+    # Page index over the like columns plus an inverted page -> likers CSR
+    def page_index(self):
+        current = self._current()
+        page_position = {}
+        page_users = []
+        for row, user_id in enumerate(self.ids):
+            if current is None or current[row]:
+                for page in self._likes(row):
+                    if page not in page_position:
+                        page_position[page] = len(page_users)
+                        page_users.append([])
+                    page_users[page_position[page]].append(user_id)
+        page_user_offsets = array("q", [0])
+        page_user_values = array("i")
+        for users in page_users:
+            page_user_values.extend(users)
+            page_user_offsets.append(len(page_user_values))
+
+        user_pages = CSRMapping(self.ids, self.index, self.like_offsets, self.likes, present=current)
+        page_likers = CSRMapping(list(page_position), page_position, page_user_offsets, page_user_values)
+        return PageIndex(user_pages, page_likers)
+
+    # Bytes held by the columns and the distinct names
+    def nbytes(self):
+        columns = (self.ids, self.name_codes, self.friend_offsets, self.friends, self.like_offsets, self.likes)
+        total = sum(len(column) * column.itemsize for column in columns)
+        total += sum(len(str(name).encode("utf-8")) for name in self.names)
+        if self.index.rows is not None:
+            total += len(self.index.rows) * self.index.rows.itemsize
+        else:
+            total += sys.getsizeof(self.index.map)
+        return total